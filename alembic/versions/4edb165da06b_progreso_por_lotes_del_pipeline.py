@@ -0,0 +1,36 @@
+"""progreso por lotes del pipeline
+
+Revision ID: 4edb165da06b
+Revises: 988e038577aa
+Create Date: 2026-10-18 09:42:17.530214
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4edb165da06b'
+down_revision: Union[str, None] = '988e038577aa'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('pipeline_progress',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('step', sa.String(), nullable=False),
+    sa.Column('tree_id', sa.Integer(), nullable=False),
+    sa.Column('item_key', sa.String(), nullable=False),
+    sa.ForeignKeyConstraint(['tree_id'], ['trees.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('step', 'tree_id', 'item_key', name='uq_pipeline_progress_step_tree_item')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('pipeline_progress')
@@ -0,0 +1,81 @@
+"""unidades relacionadas a documentos en tabla propia
+
+Revision ID: 5a784a5251a9
+Revises: 8dede87793d3
+Create Date: 2026-10-17 10:12:44.803157
+
+"""
+import json
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5a784a5251a9'
+down_revision: Union[str, None] = '8dede87793d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('related_units',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('official_document_id', sa.Integer(), nullable=False),
+    sa.Column('tree_id', sa.Integer(), nullable=False),
+    sa.Column('unit_uuid', sa.String(length=36), nullable=False),
+    sa.ForeignKeyConstraint(['official_document_id'], ['official_documents.id'], ),
+    sa.ForeignKeyConstraint(['tree_id'], ['trees.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('official_document_id', 'unit_uuid', name='uq_related_unit_document_unit')
+    )
+    with op.batch_alter_table('related_units', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_related_units_official_document_id'), ['official_document_id'], unique=False)
+        batch_op.create_index('ix_related_units_tree_id_unit_uuid', ['tree_id', 'unit_uuid'], unique=False)
+
+    # Backfill desde la lista JSON, respetando su orden
+    connection = op.get_bind()
+    documents = connection.execute(
+        sa.text("SELECT id, tree_id, related_unit_uuids FROM official_documents ORDER BY id")
+    ).fetchall()
+    rows = []
+    for document_id, tree_id, related_unit_uuids in documents:
+        for unit_uuid in dict.fromkeys(json.loads(related_unit_uuids or "[]")):
+            rows.append({"official_document_id": document_id, "tree_id": tree_id, "unit_uuid": unit_uuid})
+    if rows:
+        connection.execute(
+            sa.text("INSERT INTO related_units (official_document_id, tree_id, unit_uuid) "
+                    "VALUES (:official_document_id, :tree_id, :unit_uuid)"),
+            rows,
+        )
+
+    with op.batch_alter_table('official_documents', schema=None) as batch_op:
+        batch_op.drop_column('related_unit_uuids')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('official_documents', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('related_unit_uuids', sa.JSON(), nullable=False, server_default='[]'))
+
+    connection = op.get_bind()
+    related_units = connection.execute(
+        sa.text("SELECT official_document_id, unit_uuid FROM related_units ORDER BY id")
+    ).fetchall()
+    uuids_by_document = {}
+    for document_id, unit_uuid in related_units:
+        uuids_by_document.setdefault(document_id, []).append(unit_uuid)
+    if uuids_by_document:
+        connection.execute(
+            sa.text("UPDATE official_documents SET related_unit_uuids = :related_unit_uuids WHERE id = :id"),
+            [{"id": document_id, "related_unit_uuids": json.dumps(uuids)}
+             for document_id, uuids in uuids_by_document.items()],
+        )
+
+    with op.batch_alter_table('related_units', schema=None) as batch_op:
+        batch_op.drop_index('ix_related_units_tree_id_unit_uuid')
+        batch_op.drop_index(batch_op.f('ix_related_units_official_document_id'))
+
+    op.drop_table('related_units')
@@ -0,0 +1,40 @@
+"""treechange guarda su par de arboles
+
+Revision ID: 5d2b7e914c0a
+Revises: c3f1a9d27e64
+Create Date: 2026-10-18 17:21:09.604317
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d2b7e914c0a'
+down_revision: Union[str, None] = 'c3f1a9d27e64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('tree_changes', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('tree_id_2023', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('tree_id_2025', sa.Integer(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_tree_changes_tree_id_2023'), ['tree_id_2023'], unique=False)
+        batch_op.create_index(batch_op.f('ix_tree_changes_tree_id_2025'), ['tree_id_2025'], unique=False)
+        batch_op.create_foreign_key('fk_tree_changes_tree_id_2023_trees', 'trees', ['tree_id_2023'], ['id'])
+        batch_op.create_foreign_key('fk_tree_changes_tree_id_2025_trees', 'trees', ['tree_id_2025'], ['id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('tree_changes', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_tree_changes_tree_id_2025_trees', type_='foreignkey')
+        batch_op.drop_constraint('fk_tree_changes_tree_id_2023_trees', type_='foreignkey')
+        batch_op.drop_index(batch_op.f('ix_tree_changes_tree_id_2025'))
+        batch_op.drop_index(batch_op.f('ix_tree_changes_tree_id_2023'))
+        batch_op.drop_column('tree_id_2025')
+        batch_op.drop_column('tree_id_2023')
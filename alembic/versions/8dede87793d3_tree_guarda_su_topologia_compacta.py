@@ -0,0 +1,81 @@
+"""tree guarda su topologia compacta
+
+Revision ID: 8dede87793d3
+Revises: b2e8e7b4a44c
+Create Date: 2026-10-16 23:40:12.518204
+
+"""
+import zlib
+import uuid as uuidlib
+from collections import defaultdict
+from typing import Sequence, Union
+
+from alembic import op
+import numpy as np
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8dede87793d3'
+down_revision: Union[str, None] = 'b2e8e7b4a44c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Copia congelada de la codificación de TreeTopology al momento de esta migración,
+# para que cambios posteriores en chainsaw.model.indexes no la alteren
+def _topology_from_edges(root, edges, unit_uuids):
+    children = defaultdict(list)
+    for source, target in edges:
+        children[source].append(target)
+
+    uuids = [root]
+    parents = [-1]
+    visited = {root}
+    for position, uuid in enumerate(uuids):
+        for child in children[uuid]:
+            if child in visited:
+                raise ValueError(f"Edges do not form a tree: {child} is reached twice")
+            visited.add(child)
+            uuids.append(child)
+            parents.append(position)
+    return uuids, parents, [uuid in unit_uuids for uuid in uuids]
+
+
+def _topology_to_bytes(uuids, parents, units):
+    return zlib.compress(b"".join([
+        np.array([len(uuids)], dtype="<u4").tobytes(),
+        b"".join(uuidlib.UUID(uuid).bytes for uuid in uuids),
+        np.asarray(parents, dtype="<i4").tobytes(),
+        np.packbits(np.asarray(units, dtype=bool)).tobytes(),
+    ]))
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('trees', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('topology', sa.LargeBinary(), nullable=True))
+
+    # Backfill de los árboles existentes a partir de sus edges
+    connection = op.get_bind()
+    trees = connection.execute(sa.text("SELECT id, root_uuid FROM trees")).fetchall()
+    for tree_id, root_uuid in trees:
+        edges = connection.execute(
+            sa.text("SELECT source, target FROM edges WHERE tree_id = :tree_id ORDER BY id"),
+            {"tree_id": tree_id},
+        ).fetchall()
+        unit_uuids = connection.execute(
+            sa.text("SELECT uuid FROM units WHERE tree_id = :tree_id"),
+            {"tree_id": tree_id},
+        ).scalars().all()
+        topology = _topology_from_edges(str(root_uuid), edges, set(unit_uuids))
+        connection.execute(
+            sa.text("UPDATE trees SET topology = :topology WHERE id = :tree_id"),
+            {"topology": _topology_to_bytes(*topology), "tree_id": tree_id},
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('trees', schema=None) as batch_op:
+        batch_op.drop_column('topology')
@@ -0,0 +1,151 @@
+"""unidades con path materializado y nested set
+
+Revision ID: 988e038577aa
+Revises: 5a784a5251a9
+Create Date: 2026-10-17 12:31:08.214655
+
+"""
+import zlib
+import uuid as uuidlib
+from collections import defaultdict
+from typing import Sequence, Union
+
+from alembic import op
+import numpy as np
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '988e038577aa'
+down_revision: Union[str, None] = '5a784a5251a9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Copia congelada de TreeTopology (decodificación, armado desde edges y posiciones de unidades)
+# al momento de esta migración, para que cambios posteriores en chainsaw.model.indexes no la alteren
+def _topology_from_bytes(blob):
+    raw = zlib.decompress(blob)
+    total = int(np.frombuffer(raw, dtype="<u4", count=1)[0])
+    offset = 4
+    uuid_bytes = raw[offset:offset + 16 * total]
+    offset += 16 * total
+    parents = np.frombuffer(raw, dtype="<i4", count=total, offset=offset).astype(np.int32)
+    offset += 4 * total
+    units = np.unpackbits(np.frombuffer(raw, dtype=np.uint8, offset=offset), count=total).astype(bool)
+    uuids = [str(uuidlib.UUID(bytes=uuid_bytes[i:i + 16])) for i in range(0, 16 * total, 16)]
+    return uuids, parents.tolist(), units.tolist()
+
+
+def _topology_from_edges(root, edges, unit_uuids):
+    children = defaultdict(list)
+    for source, target in edges:
+        children[source].append(target)
+
+    uuids = [root]
+    parents = [-1]
+    visited = {root}
+    for position, uuid in enumerate(uuids):
+        for child in children[uuid]:
+            if child in visited:
+                raise ValueError(f"Edges do not form a tree: {child} is reached twice")
+            visited.add(child)
+            uuids.append(child)
+            parents.append(position)
+    return uuids, parents, [uuid in unit_uuids for uuid in uuids]
+
+
+def _unit_positions(uuids, parents, units):
+    # Por unidad: (path materializado de uuids, lft, rgt, profundidad, jurisdicción)
+    children = [[] for _ in uuids]
+    for position, parent in enumerate(parents):
+        if parent >= 0 and units[position]:
+            children[parent].append(position)
+
+    positions = {}
+    counter = 1
+    root_uuid = uuids[0]
+    stack = [(0, root_uuid, 0, root_uuid, iter(children[0]))]
+    lfts = {0: counter}
+    while stack:
+        position, path, depth, jurisdiction, pending = stack[-1]
+        child = next(pending, None)
+        if child is None:
+            stack.pop()
+            counter += 1
+            positions[uuids[position]] = (path, lfts[position], counter, depth, jurisdiction)
+        else:
+            counter += 1
+            lfts[child] = counter
+            child_uuid = uuids[child]
+            stack.append((
+                child,
+                f"{path}/{child_uuid}",
+                depth + 1,
+                child_uuid if position == 0 else jurisdiction,
+                iter(children[child]),
+            ))
+    return positions
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('units', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('materialized_path', sa.String(), nullable=True))
+        batch_op.add_column(sa.Column('lft', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('rgt', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('depth', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('jurisdiction_uuid', sa.String(length=36), nullable=True))
+        batch_op.create_index('ix_units_tree_id_lft', ['tree_id', 'lft'], unique=False)
+        batch_op.create_index('ix_units_tree_id_materialized_path', ['tree_id', 'materialized_path'], unique=False)
+        batch_op.create_index('ix_units_tree_id_jurisdiction_uuid', ['tree_id', 'jurisdiction_uuid'], unique=False)
+
+    # Backfill de los árboles existentes a partir de su topología
+    connection = op.get_bind()
+    trees = connection.execute(sa.text("SELECT id, root_uuid, topology FROM trees")).fetchall()
+    for tree_id, root_uuid, blob in trees:
+        if blob is not None:
+            topology = _topology_from_bytes(blob)
+        else:
+            edges = connection.execute(
+                sa.text("SELECT source, target FROM edges WHERE tree_id = :tree_id ORDER BY id"),
+                {"tree_id": tree_id},
+            ).fetchall()
+            unit_uuids = connection.execute(
+                sa.text("SELECT uuid FROM units WHERE tree_id = :tree_id"),
+                {"tree_id": tree_id},
+            ).scalars().all()
+            topology = _topology_from_edges(str(root_uuid), edges, set(unit_uuids))
+
+        rows = [
+            {
+                "tree_id": tree_id,
+                "uuid": uuid,
+                "materialized_path": materialized_path,
+                "lft": lft,
+                "rgt": rgt,
+                "depth": depth,
+                "jurisdiction_uuid": jurisdiction_uuid,
+            }
+            for uuid, (materialized_path, lft, rgt, depth, jurisdiction_uuid) in _unit_positions(*topology).items()
+        ]
+        if rows:
+            connection.execute(
+                sa.text("UPDATE units SET materialized_path = :materialized_path, lft = :lft, rgt = :rgt, "
+                        "depth = :depth, jurisdiction_uuid = :jurisdiction_uuid "
+                        "WHERE tree_id = :tree_id AND uuid = :uuid"),
+                rows,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('units', schema=None) as batch_op:
+        batch_op.drop_index('ix_units_tree_id_jurisdiction_uuid')
+        batch_op.drop_index('ix_units_tree_id_materialized_path')
+        batch_op.drop_index('ix_units_tree_id_lft')
+        batch_op.drop_column('jurisdiction_uuid')
+        batch_op.drop_column('depth')
+        batch_op.drop_column('rgt')
+        batch_op.drop_column('lft')
+        batch_op.drop_column('materialized_path')
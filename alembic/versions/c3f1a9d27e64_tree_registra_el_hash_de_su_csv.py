@@ -0,0 +1,30 @@
+"""tree registra el hash de su csv
+
+Revision ID: c3f1a9d27e64
+Revises: 4edb165da06b
+Create Date: 2026-10-18 16:05:43.118402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3f1a9d27e64'
+down_revision: Union[str, None] = '4edb165da06b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('trees', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('content_hash', sa.String(length=64), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('trees', schema=None) as batch_op:
+        batch_op.drop_column('content_hash')
@@ -20,7 +20,8 @@ from ipywidgets import (
 )
 
 from chainsaw.plot import Plot
-from chainsaw.model.tree import Tree
+from chainsaw.bime import BIME_SUFFIXES, READABLE_BIME_SUFFIXES, bime_stem
+from chainsaw.model.registry import TreeRegistry
 from chainsaw.model.tree_change import TreeChange
 from chainsaw.db import SessionLocal
 from chainsaw.clusters import Clusters
@@ -114,9 +115,9 @@ def PlotButton(data, method, plot_output, handle_click):
 #################################################################
 # Crear árbol en base al CSV elegido
 #################################################################
-def TreeCreator(data: dict, checkbox: Checkbox):
+def TreeCreator(data: dict, checkbox: Checkbox, incremental_checkbox: Checkbox):
     def __list_csvs(path):
-        return [f for f in os.listdir(path) if f.endswith(".csv")]
+        return [f for f in os.listdir(path) if f.endswith(READABLE_BIME_SUFFIXES)]
 
     CSVDropdown = Dropdown(
         options=__list_csvs(FILES_PATH),
@@ -132,8 +133,8 @@ def TreeCreator(data: dict, checkbox: Checkbox):
     def __on_CSVDropdown_change(change):
         if change['type'] == 'change' and change['name'] == 'value':
             filename = Path(change['new']).name
-            if filename.endswith(".csv"):
-                fecha = filename.removesuffix(".csv")
+            if filename.endswith(BIME_SUFFIXES):
+                fecha = bime_stem(filename)
                 DateIdentifierText.value = fecha
 
     CSVDropdown.observe(__on_CSVDropdown_change)
@@ -189,16 +190,15 @@ def TreeCreator(data: dict, checkbox: Checkbox):
     def __on_BuildTreeButton_click(b):
         selected_csv_file = CSVDropdown.value
         filename = Path(selected_csv_file).name
-        date_identifier = filename.removesuffix(".csv")
+        date_identifier = bime_stem(filename)
         path = os.path.join(FILES_PATH, selected_csv_file)
 
         with BuildTreeOutput:
             clear_output(wait=True)
             print(f"Creando árbol desde: {path}")
-            with SessionLocal() as session:
-                tree = Tree.load_or_create(path, session, checkbox.value)
-                data['tree'][date_identifier] = tree
-                data['df'][date_identifier] = tree.as_dataframe()
+            tree = TreeRegistry.get(path, checkbox.value, incremental=incremental_checkbox.value)
+            data['tree'][date_identifier] = tree
+            data['df'][date_identifier] = tree.as_dataframe()
             print(f"El árbol fue guardado en data['tree']['{date_identifier}']")
             print(f"El dataframe fue guardado en data['df']['{date_identifier}']")
 
@@ -222,10 +222,23 @@ def Toolbar(data: dict):
         description="Solo Administración Central",
         indent=False
     )
+    IncrementalCheckbox = Checkbox(
+        value=False,
+        description="Reutilizar resultados del árbol anterior",
+        indent=False
+    )
 
-    tree_creator_1, plot_output_1, interactive_output_1 = TreeCreator(data, checkbox=CentralAdministrationCheckbox)
-    tree_creator_2, plot_output_2, interactive_output_2 = TreeCreator(data, checkbox=CentralAdministrationCheckbox)
-    ToolbarComplete = VBox([CentralAdministrationCheckbox,
+    tree_creator_1, plot_output_1, interactive_output_1 = TreeCreator(
+        data,
+        checkbox=CentralAdministrationCheckbox,
+        incremental_checkbox=IncrementalCheckbox,
+    )
+    tree_creator_2, plot_output_2, interactive_output_2 = TreeCreator(
+        data,
+        checkbox=CentralAdministrationCheckbox,
+        incremental_checkbox=IncrementalCheckbox,
+    )
+    ToolbarComplete = VBox([HBox([CentralAdministrationCheckbox, IncrementalCheckbox]),
                             HBox([DownloadButtonsCreator(), tree_creator_1, tree_creator_2])])
     InteractiveOutputs = HBox([interactive_output_1, interactive_output_2])
     Plots = HBox([plot_output_1, plot_output_2])
@@ -0,0 +1,97 @@
+import io
+import os
+import csv
+import gzip
+from tqdm import tqdm
+from pathlib import Path
+from typing import Iterator, Optional
+from chainsaw.enum.field import Field
+
+try:
+    import zstandard
+except ImportError:
+    # Dependencia opcional (extra "zst"): sin ella no se pueden leer los .csv.zst
+    zstandard = None
+
+
+BIME_SUFFIXES = (".csv", ".csv.gz", ".csv.zst")
+# Los que se pueden leer con las dependencias instaladas
+READABLE_BIME_SUFFIXES = BIME_SUFFIXES if zstandard is not None else (".csv", ".csv.gz")
+
+
+def bime_stem(path_file) -> str:
+    # "2025_07_08.csv.gz" -> "2025_07_08"
+    name = Path(path_file).name
+    for suffix in sorted(BIME_SUFFIXES, key=len, reverse=True):
+        if name.endswith(suffix):
+            return name.removesuffix(suffix)
+    return Path(path_file).stem
+
+
+# Lee el CSV del BIME en una sola pasada (también comprimido), validando el esquema de `Field`
+# y descartando las filas cuyo tipo de administración no interesa antes de llegar al árbol.
+class BIMEReader:
+    def __init__(
+        self,
+        path_file,
+        administration_types: Optional[set[str]] = None,
+        desc: str = "Procesando nodos",
+    ) -> None:
+        self.path_file = Path(path_file)
+        self.administration_types = administration_types
+        self.desc = desc
+
+    def __enter__(self) -> Iterator[list[str]]:
+        self.__raw = self.path_file.open("rb")
+        self.__text = io.TextIOWrapper(
+            self.__decompressed(self.__raw),
+            encoding="utf-8-sig",
+            newline="",
+        )
+        self.__progress = tqdm(
+            total=os.path.getsize(self.path_file),
+            unit="B",
+            unit_scale=True,
+            desc=self.desc,
+        )
+        return self.__rows()
+
+    def __exit__(self, *_) -> None:
+        self.__progress.close()
+        self.__text.close()
+        self.__raw.close()
+
+    def __decompressed(self, raw):
+        if self.path_file.name.endswith(".gz"):
+            return gzip.GzipFile(fileobj=raw, mode="rb")
+        if self.path_file.name.endswith(".zst"):
+            if zstandard is None:
+                raise ImportError(f"Reading {self.path_file.name} requires the 'zst' extra (zstandard package)")
+            return zstandard.ZstdDecompressor().stream_reader(raw)
+        return raw
+
+    @classmethod
+    def __validate_header(cls, header: list[str]) -> None:
+        columns = [column.strip() for column in header]
+        expected = [field.name for field in Field]
+        if columns != expected:
+            raise ValueError(
+                f"Unexpected BIME header: expected {len(expected)} columns {expected}, got {len(columns)} {columns}"
+            )
+
+    def __rows(self) -> Iterator[list[str]]:
+        reader = csv.reader(self.__text)
+        self.__validate_header(next(reader))
+
+        administration_type = Field.tipo_administracion.value
+        for data in reader:
+            self.__progress.update(self.__raw.tell() - self.__progress.n)
+            if not data:
+                continue
+            if len(data) != len(Field):
+                raise ValueError(f"Line {reader.line_num} has {len(data)} columns instead of {len(Field)}")
+            if (
+                self.administration_types is None or
+                data[administration_type].strip() in self.administration_types
+            ):
+                yield data
@@ -3,6 +3,8 @@ import hdbscan
 import pandas as pd
 from sklearn.manifold import TSNE
 from sklearn.feature_extraction.text import TfidfVectorizer
+from sqlalchemy import and_
+from sqlalchemy.orm import aliased
 
 from chainsaw.model.node import Unit
 from chainsaw.model.official_document import Objective, Prompt
@@ -37,26 +39,38 @@ def Clusters(
     )
 
     def __units_from(tree, parents: list[str]):
-        return list(set(
-            node for node in tree.nodes
-            if isinstance(node, Unit)
-            and not (node.name in excluded_units)
-            and (
-                (consider_substantive_units and (node.unit_class == "Sustantiva")) or
-                (consider_support_units and (node.unit_class == "Apoyo")) or
-                (consider_control_units and (node.unit_class == "Control")))
-            and (node.range in (
-                'Ministerio',
-                'Secretaría',
-                'Subsecretaría',
-                'Jefatura Gabinete de Ministros',
-                'Escribanía',
-                'Dirección Nacional - General', 'Dirección Primer Nivel Operativo', 'Dirección Segundo Nivel Operativo', 'Coordinación',
-                ''
-                ))
-            and (path := tree.path_to(node.uuid))
-            and any(each in path for each in parents)
-        ))
+        # Unidades con alguno de los padres en su path: un rango lft/rgt por ancestro, en una sola consulta
+        ancestor = aliased(Unit)
+        unit_classes = [unit_class for unit_class, considered in (
+            ("Sustantiva", consider_substantive_units),
+            ("Apoyo", consider_support_units),
+            ("Control", consider_control_units),
+        ) if considered]
+        return session.query(Unit)\
+            .join(
+                ancestor,
+                and_(
+                    ancestor.tree_id == Unit.tree_id,
+                    Unit.lft.between(ancestor.lft, ancestor.rgt),
+                ))\
+            .filter(
+                Unit.tree_id == tree.id,
+                ancestor.name.in_(parents),
+                Unit.name.notin_(excluded_units),
+                Unit.unit_class.in_(unit_classes),
+                Unit.range.in_((
+                    'Ministerio',
+                    'Secretaría',
+                    'Subsecretaría',
+                    'Jefatura Gabinete de Ministros',
+                    'Escribanía',
+                    'Dirección Nacional - General', 'Dirección Primer Nivel Operativo', 'Dirección Segundo Nivel Operativo', 'Coordinación',
+                    ''
+                )),
+            )\
+            .distinct()\
+            .order_by(Unit.lft)\
+            .all()
 
     def __make_tf_idf_for(corpus):
         vectorizer = TfidfVectorizer(
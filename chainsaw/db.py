@@ -1,12 +1,114 @@
 import os
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import threading
+from sqlalchemy import Engine, create_engine, event, make_url
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
 
 
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 DB_PATH = os.path.join(BASE_DIR, 'data', 'database.db')
 os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
 
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+
+# Pragmas que se aplican a cada conexión SQLite nueva, según SQLITE_PROFILE. Por defecto "none" (sin cambios);
+# "bulk" para cargas y el pipeline (muchas escrituras) y "analysis" para notebooks y dashboards se eligen a mano
+SQLITE_PROFILES = {
+    "bulk": {
+        "busy_timeout": 60000,
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -262144,
+        "temp_store": "MEMORY",
+        "mmap_size": 268435456,
+        "wal_autocheckpoint": 10000,
+    },
+    "analysis": {
+        "busy_timeout": 10000,
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -131072,
+        "temp_store": "MEMORY",
+        "mmap_size": 1073741824,
+    },
+    "none": {},
+}
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "none")
+if SQLITE_PROFILE not in SQLITE_PROFILES:
+    raise ValueError(f"Unknown SQLite profile: {SQLITE_PROFILE}")
+
 Base = declarative_base()
-engine = create_engine(f"sqlite:///{DB_PATH}", echo=False)
-SessionLocal = sessionmaker(bind=engine)
+
+
+# Un engine (y su sessionmaker) por URL y por proceso, para no pagar create_engine, la inicialización del
+# dialecto y una conexión nueva en cada sesión. Después de un fork el hijo arranca con pools vacíos.
+class EngineRegistry:
+    __engines: dict[str, tuple[Engine, sessionmaker]] = {}
+    __lock = threading.Lock()
+
+    @classmethod
+    def __key_for(cls, db_url) -> str:
+        return make_url(db_url).render_as_string(hide_password=False)
+
+    @classmethod
+    def __options_for(cls, db_url) -> dict:
+        url = make_url(db_url)
+        if url.get_backend_name() == "sqlite":
+            if url.database in (None, "", ":memory:"):
+                # Una base en memoria existe solo dentro de su conexión: todos comparten la misma
+                return {"poolclass": StaticPool, "connect_args": {"check_same_thread": False}}
+            return {"pool_size": DB_POOL_SIZE, "max_overflow": DB_MAX_OVERFLOW}
+        return {
+            "pool_size": DB_POOL_SIZE,
+            "max_overflow": DB_MAX_OVERFLOW,
+            "pool_recycle": DB_POOL_RECYCLE,
+            "pool_pre_ping": True,
+        }
+
+    @classmethod
+    def __entry_for(cls, db_url) -> tuple[Engine, sessionmaker]:
+        key = cls.__key_for(db_url)
+        with cls.__lock:
+            try:
+                return cls.__engines[key]
+            except KeyError:
+                engine = create_engine(key, echo=False, **cls.__options_for(db_url))
+                if engine.dialect.name == "sqlite":
+                    event.listen(engine, "connect", cls.__apply_pragmas)
+                cls.__engines[key] = (engine, sessionmaker(bind=engine))
+                return cls.__engines[key]
+
+    @classmethod
+    def __apply_pragmas(cls, dbapi_connection, connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        for pragma, value in SQLITE_PROFILES[SQLITE_PROFILE].items():
+            cursor.execute(f"PRAGMA {pragma} = {value}")
+        cursor.close()
+
+    @classmethod
+    def engine_for(cls, db_url) -> Engine:
+        return cls.__entry_for(db_url)[0]
+
+    @classmethod
+    def sessionmaker_for(cls, db_url) -> sessionmaker:
+        return cls.__entry_for(db_url)[1]
+
+    @classmethod
+    def session_for(cls, db_url, **options) -> Session:
+        return cls.sessionmaker_for(db_url)(**options)
+
+    @classmethod
+    def reset_after_fork(cls) -> None:
+        # El pool heredado se abandona sin cerrar sus conexiones (siguen siendo del padre)
+        cls.__lock = threading.Lock()
+        for engine, _ in cls.__engines.values():
+            engine.dispose(close=False)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=EngineRegistry.reset_after_fork)
+
+engine = EngineRegistry.engine_for(f"sqlite:///{DB_PATH}")
+SessionLocal = EngineRegistry.sessionmaker_for(f"sqlite:///{DB_PATH}")
@@ -1,9 +1,9 @@
+import numpy as np
 from abc import ABC, abstractmethod
 from typing import List, Dict, Any, Type
 from suitable_class_finder import SuitableClassFinder
-from networkx.algorithms.lowest_common_ancestors import lowest_common_ancestor
-from chainsaw.db import SessionLocal
 from chainsaw.model.tree import Tree
+from chainsaw.model.registry import TreeRegistry
 from chainsaw.heatmaps.constants import DimensionName
 
 
@@ -30,6 +30,14 @@ class Dimension(ABC):
         self.central_administration_only = central_administration_only
         self.threshold = threshold
 
+    @property
+    def tree(self) -> Tree:
+        return TreeRegistry.get(
+            self.tree_file,
+            central_administration_only=self.central_administration_only,
+            units_only=True,
+        )
+
     @abstractmethod
     def partial_matrix(self, units_order) -> List[List[float]]:
         pass
@@ -39,54 +47,30 @@ class DistanceDimension(Dimension):
     DIMENSION_NAME = DimensionName.DISTANCE
 
     @classmethod
-    def __generate_root_distances(cls, units_order, tree) -> Dict[str, int]:
-        root_distances = {}
-        for unit_uuid in units_order.keys():
-            path = tree.uuid_path_to(unit_uuid)
-            for uuid in path:
-                try:
-                    root_distances[uuid]
-                except KeyError:
-                    root_distances[uuid] = len(tree.uuid_path_to(uuid))
-        return root_distances
-
-    @classmethod
-    def __path_distance(cls, tree, row_uuid, column_uuid, root_distances) -> float:
-        parent_uuid = lowest_common_ancestor(tree.graph, row_uuid, column_uuid)
-        if parent_uuid in (row_uuid, column_uuid):
-            return 0.0
-
-        row_distance = root_distances[row_uuid]
-        column_distance = root_distances[column_uuid]
-        parent_distance = root_distances[parent_uuid]
-        length = (row_distance - parent_distance) + (column_distance - parent_distance)
-        deepest_uuid = max(row_distance, column_distance)
-        return length / deepest_uuid
+    def __path_distances(cls, tree, row_uuids, column_uuids) -> np.ndarray:
+        # Distancia entre unidades normalizada por la profundidad de la más profunda (contando la raíz)
+        lengths = tree.tree_distances(row_uuids, column_uuids)
+        row_distances = np.array([tree.depth_of(uuid) + 1 for uuid in row_uuids])
+        column_distances = np.array([tree.depth_of(uuid) + 1 for uuid in column_uuids])
+        deepest = np.maximum(row_distances, column_distances)
+        # Si una unidad es ancestro de la otra, la distancia es 0
+        nested = lengths == np.abs(row_distances - column_distances)
+        return np.where(nested, 0.0, lengths / deepest)
 
     def partial_matrix(self, units_order) -> List[List[float]]:
         total = len(units_order)
         units_inverted = {unit_data["idx"]: uuid for uuid, unit_data in units_order.items()}
-        matrix = [[0.0 for j in range(total)] for i in range(total)]
-
-        with SessionLocal() as session:
-            tree = Tree.load_or_create(
-                self.tree_file,
-                session,
-                central_administration_only=self.central_administration_only,
-            )
-            root_distances = self.__generate_root_distances(units_order, tree)
-
-            for row_idx in range(total):
-                for column_idx in range(row_idx + 1, total):
-                    value = self.__path_distance(
-                        tree,
-                        units_inverted[row_idx],
-                        units_inverted[column_idx],
-                        root_distances,
-                    )
-                    matrix[row_idx][column_idx] = value
-                    matrix[column_idx][row_idx] = value
-        return matrix
+        matrix = np.zeros((total, total))
+
+        row_idxs, column_idxs = np.triu_indices(total, k=1)
+        values = self.__path_distances(
+            self.tree,
+            [units_inverted[row_idx] for row_idx in row_idxs],
+            [units_inverted[column_idx] for column_idx in column_idxs],
+        )
+        matrix[row_idxs, column_idxs] = values
+        matrix[column_idxs, row_idxs] = values
+        return matrix.tolist()
 
 
 class AbstractLLMBasedDimension(Dimension):
@@ -1,3 +1,5 @@
 from chainsaw.model.tree import Edge, Tree
 from chainsaw.model.node import Node, Unit, Charge
 from chainsaw.model.official_document import OfficialDocument
+from chainsaw.model.records import NodeRecord, TreeRecords
+from chainsaw.model.registry import TreeRegistry
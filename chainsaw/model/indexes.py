@@ -0,0 +1,348 @@
+import zlib
+import uuid as uuidlib
+import numpy as np
+import networkx as nx
+import pandas as pd
+from collections import defaultdict
+from typing import Iterable, Mapping, NamedTuple, Optional, Sequence
+
+
+# Topología compacta del árbol: uuids en orden BFS, índice del padre de cada uno y si es unidad o cargo
+class TreeTopology(NamedTuple):
+    uuids: list[str]
+    parents: np.ndarray
+    units: np.ndarray
+
+    @classmethod
+    def from_edges(
+        cls,
+        root: str,
+        edges: Iterable[tuple[str, str]],
+        unit_uuids: set[str],
+    ) -> "TreeTopology":
+        children = defaultdict(list)
+        for source, target in edges:
+            children[source].append(target)
+
+        uuids = [root]
+        parents = [-1]
+        visited = {root}
+        for position, uuid in enumerate(uuids):
+            for child in children[uuid]:
+                # Un ciclo (o un nodo con dos padres) haría que el recorrido no termine
+                if child in visited:
+                    raise ValueError(f"Edges do not form a tree: {child} is reached twice")
+                visited.add(child)
+                uuids.append(child)
+                parents.append(position)
+        return cls(
+            uuids=uuids,
+            parents=np.asarray(parents, dtype=np.int32),
+            units=np.asarray([uuid in unit_uuids for uuid in uuids], dtype=bool),
+        )
+
+    @classmethod
+    def from_bytes(cls, blob: bytes) -> "TreeTopology":
+        raw = zlib.decompress(blob)
+        total = int(np.frombuffer(raw, dtype="<u4", count=1)[0])
+        offset = 4
+        uuid_bytes = raw[offset:offset + 16 * total]
+        offset += 16 * total
+        parents = np.frombuffer(raw, dtype="<i4", count=total, offset=offset).astype(np.int32)
+        offset += 4 * total
+        units = np.unpackbits(np.frombuffer(raw, dtype=np.uint8, offset=offset), count=total).astype(bool)
+        return cls(
+            uuids=[str(uuidlib.UUID(bytes=uuid_bytes[i:i + 16])) for i in range(0, 16 * total, 16)],
+            parents=parents,
+            units=units,
+        )
+
+    def to_bytes(self) -> bytes:
+        return zlib.compress(b"".join([
+            np.array([len(self.uuids)], dtype="<u4").tobytes(),
+            b"".join(uuidlib.UUID(uuid).bytes for uuid in self.uuids),
+            self.parents.astype("<i4").tobytes(),
+            np.packbits(self.units).tobytes(),
+        ]))
+
+    def only_units(self) -> "TreeTopology":
+        # Los cargos son siempre hojas, así que sacarlos no deja nodos huérfanos
+        keep = np.flatnonzero(self.units)
+        if len(keep) == len(self.uuids):
+            return self
+        new_positions = np.full(len(self.uuids), -1, dtype=np.int32)
+        new_positions[keep] = np.arange(len(keep), dtype=np.int32)
+        parents = self.parents[keep]
+        return TreeTopology(
+            uuids=[self.uuids[position] for position in keep],
+            parents=np.where(parents >= 0, new_positions[np.maximum(parents, 0)], -1).astype(np.int32),
+            units=np.ones(len(keep), dtype=bool),
+        )
+
+    def edges(self) -> Iterable[tuple[str, str]]:
+        return ((self.uuids[parent], uuid)
+                for uuid, parent in zip(self.uuids, self.parents)
+                if parent >= 0)
+
+    def unit_positions(self) -> dict[str, tuple[str, int, int, int, str]]:
+        # Por unidad: (path materializado de uuids, lft, rgt, profundidad, jurisdicción).
+        # lft/rgt numeran solo unidades: los descendientes de u son los que tienen lft entre u.lft y u.rgt
+        children = [[] for _ in self.uuids]
+        for position, parent in enumerate(self.parents):
+            if parent >= 0 and self.units[position]:
+                children[parent].append(position)
+
+        positions = {}
+        counter = 1
+        root_uuid = self.uuids[0]
+        stack = [(0, self.uuids[0], 0, root_uuid, iter(children[0]))]
+        lfts = {0: counter}
+        while stack:
+            position, path, depth, jurisdiction, pending = stack[-1]
+            child = next(pending, None)
+            if child is None:
+                stack.pop()
+                counter += 1
+                positions[self.uuids[position]] = (path, lfts[position], counter, depth, jurisdiction)
+            else:
+                counter += 1
+                lfts[child] = counter
+                child_uuid = self.uuids[child]
+                stack.append((
+                    child,
+                    f"{path}/{child_uuid}",
+                    depth + 1,
+                    child_uuid if position == 0 else jurisdiction,
+                    iter(children[child]),
+                ))
+        return positions
+
+
+# Árbol con índices enteros (mismo orden que la topología): hijos en formato CSR, padres y profundidades en
+# arrays de NumPy. Con el orden DFS pre-orden cada subárbol es un rango contiguo, así que pedir los
+# descendientes de un nodo es un slice.
+class TreeArrays:
+    def __init__(self, topology: TreeTopology) -> None:
+        self.uuids: list[str] = list(topology.uuids)
+        self.positions: dict[str, int] = {uuid: position for position, uuid in enumerate(self.uuids)}
+        self.parents = np.asarray(topology.parents, dtype=np.int32)
+        self.units = np.asarray(topology.units, dtype=bool)
+        total = len(self.uuids)
+
+        # En orden BFS el padre siempre aparece antes que el hijo
+        depths = [0] * total
+        for position in range(1, total):
+            depths[position] = depths[self.parents[position]] + 1
+        self.depths = np.asarray(depths, dtype=np.int32)
+
+        child_positions = np.arange(1, total, dtype=np.int32)
+        self.children = child_positions[np.argsort(self.parents[1:], kind="stable")]
+        self.child_offsets = np.zeros(total + 1, dtype=np.int32)
+        np.cumsum(np.bincount(self.parents[1:], minlength=total), out=self.child_offsets[1:])
+
+        levels = [np.flatnonzero(self.depths == depth) for depth in range(int(self.depths.max(initial=0)) + 1)]
+        self.sizes = np.ones(total, dtype=np.int32)
+        for level in reversed(levels[1:]):
+            np.add.at(self.sizes, self.parents[level], self.sizes[level])
+
+        # Posición de cada hijo en el pre-orden: la del padre, más uno, más lo que ocupan los hermanos anteriores
+        child_sizes = self.sizes[self.children]
+        cumulative = np.cumsum(child_sizes) - child_sizes
+        preceding = cumulative - cumulative[self.child_offsets[self.parents[self.children]]]
+        offsets_in_parent = np.zeros(total, dtype=np.int32)
+        offsets_in_parent[self.children] = preceding
+        self.entries = np.zeros(total, dtype=np.int32)
+        for level in levels[1:]:
+            self.entries[level] = self.entries[self.parents[level]] + 1 + offsets_in_parent[level]
+        self.preorder = np.empty(total, dtype=np.int32)
+        self.preorder[self.entries] = np.arange(total, dtype=np.int32)
+
+    def index_of(self, uuid: str) -> int:
+        return self.positions[uuid]
+
+    def indices_of(self, uuids: Sequence[str]) -> np.ndarray:
+        return np.fromiter((self.positions[uuid] for uuid in uuids), dtype=np.int32, count=len(uuids))
+
+    def uuids_at(self, indices: Iterable[int]) -> list[str]:
+        return [self.uuids[index] for index in indices]
+
+    def children_of(self, index: int) -> np.ndarray:
+        return self.children[self.child_offsets[index]:self.child_offsets[index + 1]]
+
+    def subtree(self, index: int) -> np.ndarray:
+        # El propio nodo y todos sus descendientes, en pre-orden
+        start = self.entries[index]
+        return self.preorder[start:start + self.sizes[index]]
+
+    def subtree_mask(self, indices: np.ndarray) -> np.ndarray:
+        # Marca los nodos que están en el subárbol de alguno de los índices
+        coverage = np.zeros(len(self.uuids) + 1, dtype=np.int32)
+        np.add.at(coverage, self.entries[indices], 1)
+        np.add.at(coverage, self.entries[indices] + self.sizes[indices], -1)
+        return (np.cumsum(coverage[:-1]) > 0)[self.entries]
+
+    def is_ancestor(self, ancestor: int, descendant: int) -> bool:
+        return bool(self.entries[ancestor] <= self.entries[descendant] < self.entries[ancestor] + self.sizes[ancestor])
+
+    def ancestors(self, index: int) -> list[int]:
+        # Desde la raíz hasta el nodo, inclusive
+        path = [index]
+        while (parent := self.parents[path[-1]]) >= 0:
+            path.append(int(parent))
+        path.reverse()
+        return path
+
+    def as_networkx(self) -> nx.DiGraph:
+        graph = nx.DiGraph()
+        graph.add_nodes_from(self.uuids)
+        graph.add_edges_from((self.uuids[parent], uuid)
+                             for uuid, parent in zip(self.uuids, self.parents)
+                             if parent >= 0)
+        return graph
+
+
+# Índice de facetas sobre las unidades: cada faceta es un array de códigos enteros más la lista de valores
+# distintos. Los filtros se resuelven sobre los valores (pocos) y después con máscaras sobre los códigos,
+# sin recorrer nodos. Un criterio puede ser un valor, una lista de valores o un predicado sobre el valor.
+class FacetIndex:
+    def __init__(self, arrays: TreeArrays, uuids: Sequence[str], facets: Mapping[str, Sequence]) -> None:
+        self.arrays = arrays
+        self.uuids = list(uuids)
+        self.nodes = arrays.indices_of(self.uuids)
+        self.categories: dict[str, list] = {}
+        self.codes: dict[str, np.ndarray] = {}
+        for facet, values in facets.items():
+            categories, codes = np.unique(np.asarray(values), return_inverse=True)
+            self.categories[facet] = categories.tolist()
+            self.codes[facet] = codes.astype(np.int32)
+
+    def __wanted_codes(self, facet: str, criterion) -> np.ndarray:
+        categories = self.categories[facet]
+        if callable(criterion):
+            return np.asarray([code for code, value in enumerate(categories) if criterion(value)], dtype=np.int32)
+        values = set(criterion) if isinstance(criterion, (list, tuple, set, frozenset)) else {criterion}
+        return np.asarray([code for code, value in enumerate(categories) if value in values], dtype=np.int32)
+
+    def mask(
+        self,
+        within: Optional[Iterable[str]] = None,
+        among: Optional[Iterable[str]] = None,
+        **criteria,
+    ) -> np.ndarray:
+        # within: uuids de ancestros (se incluyen sus subárboles); among: uuids a considerar
+        mask = np.ones(len(self.uuids), dtype=bool)
+        for facet, criterion in criteria.items():
+            mask &= np.isin(self.codes[facet], self.__wanted_codes(facet, criterion))
+        if within is not None:
+            ancestors = [self.arrays.positions[uuid] for uuid in within if uuid in self.arrays.positions]
+            mask &= self.arrays.subtree_mask(np.asarray(ancestors, dtype=np.int32))[self.nodes]
+        if among is not None:
+            selected = np.zeros(len(self.arrays.uuids), dtype=bool)
+            selected[[self.arrays.positions[uuid] for uuid in among if uuid in self.arrays.positions]] = True
+            mask &= selected[self.nodes]
+        return mask
+
+    def select(self, **filters) -> list[str]:
+        return [self.uuids[position] for position in np.flatnonzero(self.mask(**filters))]
+
+    def count(self, **filters) -> int:
+        return int(np.count_nonzero(self.mask(**filters)))
+
+    def counts(self, by: Sequence[str], **filters) -> pd.Series:
+        # Cantidad de unidades por combinación de valores de las facetas en `by` (solo las que aparecen)
+        by = list(by)
+        mask = self.mask(**filters)
+        shape = tuple(len(self.categories[facet]) for facet in by)
+        combined = np.ravel_multi_index(tuple(self.codes[facet][mask] for facet in by), shape)
+        totals = np.bincount(combined, minlength=int(np.prod(shape)))
+        present = np.flatnonzero(totals)
+        codes = np.unravel_index(present, shape)
+        levels = [np.asarray(self.categories[facet], dtype=object)[code] for facet, code in zip(by, codes)]
+        index = (pd.MultiIndex.from_arrays(levels, names=by)
+                 if len(by) > 1
+                 else pd.Index(levels[0], name=by[0]))
+        return pd.Series(totals[present], index=index, name="count")
+
+
+# Euler tour + sparse table: O(n log n) de construcción y O(1) por consulta
+class LowestCommonAncestorIndex:
+    def __init__(self, root: str, children: Mapping[str, Iterable[str]]) -> None:
+        self.uuids: list[str] = []
+        self.positions: dict[str, int] = {}
+        euler = []
+        euler_depths = []
+        first = []
+
+        stack = [(root, 0, iter(children[root]))]
+        self.__visit(root, 0, euler, euler_depths, first)
+        while stack:
+            uuid, depth, pending = stack[-1]
+            child = next(pending, None)
+            if child is None:
+                stack.pop()
+                if stack:
+                    parent, parent_depth, _ = stack[-1]
+                    euler.append(self.positions[parent])
+                    euler_depths.append(parent_depth)
+            else:
+                self.__visit(child, depth + 1, euler, euler_depths, first)
+                stack.append((child, depth + 1, iter(children[child])))
+
+        self.euler = np.asarray(euler, dtype=np.int64)
+        self.euler_depths = np.asarray(euler_depths, dtype=np.int64)
+        self.first = np.asarray(first, dtype=np.int64)
+        self.depths = np.zeros(len(self.uuids), dtype=np.int64)
+        self.depths[self.euler] = self.euler_depths
+        self.__build_sparse_table()
+
+    def __visit(self, uuid: str, depth: int, euler: list, euler_depths: list, first: list) -> None:
+        self.positions[uuid] = len(self.uuids)
+        self.uuids.append(uuid)
+        first.append(len(euler))
+        euler.append(self.positions[uuid])
+        euler_depths.append(depth)
+
+    def __build_sparse_table(self) -> None:
+        length = len(self.euler)
+        levels = max(1, int(np.log2(length)) + 1)
+        # table[k][i] es la posición del tour con menor profundidad en [i, i + 2^k)
+        self.table = np.zeros((levels, length), dtype=np.int64)
+        self.table[0] = np.arange(length)
+        for level in range(1, levels):
+            span = 1 << (level - 1)
+            previous = self.table[level - 1]
+            left = previous[:length - span]
+            right = previous[span:]
+            self.table[level] = previous
+            self.table[level, :length - span] = np.where(
+                self.euler_depths[left] <= self.euler_depths[right],
+                left,
+                right,
+            )
+
+    def indices_of(self, uuids: Sequence[str]) -> np.ndarray:
+        return np.fromiter((self.positions[uuid] for uuid in uuids), dtype=np.int64, count=len(uuids))
+
+    def lca_indices(self, sources: np.ndarray, targets: np.ndarray) -> np.ndarray:
+        left = np.minimum(self.first[sources], self.first[targets])
+        right = np.maximum(self.first[sources], self.first[targets])
+        levels = np.log2(right - left + 1).astype(np.int64)
+        candidates_left = self.table[levels, left]
+        candidates_right = self.table[levels, right - (1 << levels) + 1]
+        best = np.where(
+            self.euler_depths[candidates_left] <= self.euler_depths[candidates_right],
+            candidates_left,
+            candidates_right,
+        )
+        return self.euler[best]
+
+    def lca(self, source: str, target: str) -> str:
+        indices = self.lca_indices(
+            np.array([self.positions[source]]),
+            np.array([self.positions[target]]),
+        )
+        return self.uuids[indices[0]]
+
+    def distances(self, sources: np.ndarray, targets: np.ndarray) -> np.ndarray:
+        ancestors = self.lca_indices(sources, targets)
+        return self.depths[sources] + self.depths[targets] - 2 * self.depths[ancestors]
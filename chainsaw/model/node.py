@@ -1,5 +1,5 @@
-from typing import Any, List
-from sqlalchemy import ForeignKey, String, UniqueConstraint
+from typing import Any, List, Optional
+from sqlalchemy import ForeignKey, Index, String, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from chainsaw.db import Base
 from chainsaw.enum.field import Field
@@ -26,12 +26,21 @@ class Unit(Node):
     __tablename__ = "units"
     __table_args__ = (
         UniqueConstraint("uuid", "tree_id", name="uq_node_uuid_tree_id"),
+        Index("ix_units_tree_id_lft", "tree_id", "lft"),
+        Index("ix_units_tree_id_materialized_path", "tree_id", "materialized_path"),
+        Index("ix_units_tree_id_jurisdiction_uuid", "tree_id", "jurisdiction_uuid"),
     )
 
     unit_class: Mapped[str] = mapped_column(nullable=False)
     charges: Mapped[List["Charge"]] = relationship(back_populates="unit")
     tree: Mapped["Tree"] = relationship(back_populates="units")
     range: Mapped[str] = mapped_column()
+    # Posición en el árbol, para filtrar subárboles desde SQL (se completan al persistir el árbol)
+    materialized_path: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    lft: Mapped[Optional[int]] = mapped_column(nullable=True)
+    rgt: Mapped[Optional[int]] = mapped_column(nullable=True)
+    depth: Mapped[Optional[int]] = mapped_column(nullable=True)
+    jurisdiction_uuid: Mapped[Optional[str]] = mapped_column(String(36), nullable=True)
 
     def __init__(self, data: dict, uuid: str, tree_id: int):
         super().__init__()
@@ -59,7 +68,7 @@ class Charge(Node):
     def __init__(
         self,
         data: dict,
-        unit_id: int,
+        unit: Unit,
         uuid: str,
         tree_id: int,
     ):
@@ -71,7 +80,7 @@ class Charge(Node):
         self.last_name = self.get_field(data, Field.autoridad_apellido)
         self.reports_to = self.get_field(data, Field.reporta_a)
         self.type = self.get_field(data, Field.tipo_administracion)
-        self.unit_id = unit_id
+        self.unit = unit
         self.uuid = uuid
         full_name = f": {self.last_name}, {self.first_name}" if self.last_name else ""
         self.name = f"{self.charge_name} ({self.charge_order}){full_name}"
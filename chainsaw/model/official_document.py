@@ -1,16 +1,18 @@
 import datetime
-from typing import Optional, List
-from sqlalchemy.types import JSON
+from typing import Optional, List, Iterable
 from sqlalchemy import (
     Text,
     Date,
     String,
     Integer,
     ForeignKey,
+    Index,
     UniqueConstraint,
+    func,
+    insert,
+    select,
 )
-from sqlalchemy.ext.mutable import MutableList
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.orm import Mapped, mapped_column, relationship, aliased, selectinload
 from chainsaw.db import Base
 from chainsaw.model.node import Unit
 
@@ -40,6 +42,42 @@ class Prompt(Base):
         cascade="all, delete-orphan"
     )
 
+    @classmethod
+    def carry_over(
+        cls,
+        unit_uuids: set[str],
+        previous_tree_id: int,
+        tree_id: int,
+        session,
+    ) -> None:
+        # Copia los prompts (y sus objetivos) de unidades que no cambiaron, así el pipeline las saltea
+        if not unit_uuids:
+            return
+        previous_prompts = session.query(cls)\
+            .options(selectinload(cls.objective))\
+            .filter(
+                cls.tree_id == previous_tree_id,
+                cls.unit_uuid.in_(unit_uuids),
+            )\
+            .order_by(cls.id)\
+            .all()
+        prompts = []
+        for previous_prompt in previous_prompts:
+            prompt = cls(
+                text=previous_prompt.text,
+                urls=previous_prompt.urls,
+                unit_uuid=previous_prompt.unit_uuid,
+                tree_id=tree_id,
+            )
+            if previous_prompt.objective is not None:
+                prompt.objective = Objective(
+                    text=previous_prompt.objective.text,
+                    urls=previous_prompt.objective.urls,
+                )
+            prompts.append(prompt)
+        session.add_all(prompts)
+        session.flush()
+
 
 class ScrappedBlock(Base):
     __tablename__ = "scrapped_blocks"
@@ -67,6 +105,20 @@ class ScrappedDocument(Base):
     )
 
 
+class RelatedUnit(Base):
+    __tablename__ = "related_units"
+    __table_args__ = (
+        UniqueConstraint("official_document_id", "unit_uuid", name="uq_related_unit_document_unit"),
+        Index("ix_related_units_tree_id_unit_uuid", "tree_id", "unit_uuid"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    official_document_id: Mapped[int] = mapped_column(ForeignKey("official_documents.id"), index=True)
+    tree_id: Mapped[int] = mapped_column(ForeignKey("trees.id"), nullable=False)
+    unit_uuid: Mapped[str] = mapped_column(String(36), nullable=False)
+    official_document = relationship("OfficialDocument", back_populates="related_units")
+
+
 class OfficialDocument(Base):
     __tablename__ = "official_documents"
     __table_args__ = (
@@ -75,10 +127,11 @@ class OfficialDocument(Base):
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     url: Mapped[str] = mapped_column(String, index=True)
-    related_unit_uuids: Mapped[List[str]] = mapped_column(
-        MutableList.as_mutable(JSON),
-        default=list,
-        nullable=False
+    related_units: Mapped[List[RelatedUnit]] = relationship(
+        "RelatedUnit",
+        back_populates="official_document",
+        cascade="all, delete-orphan",
+        order_by="RelatedUnit.id",
     )
     scrapped_documents: Mapped[List["ScrappedDocument"]] = relationship(
         "ScrappedDocument",
@@ -89,6 +142,13 @@ class OfficialDocument(Base):
     tree_id: Mapped[int] = mapped_column(ForeignKey("trees.id"), nullable=False)
     tree = relationship("Tree", back_populates="official_documents")
 
+    @property
+    def related_unit_uuids(self) -> list[str]:
+        return [related.unit_uuid for related in self.related_units]
+
+    def relate_to(self, unit_uuid: str) -> None:
+        self.related_units.append(RelatedUnit(tree_id=self.tree_id, unit_uuid=unit_uuid))
+
     @classmethod
     def get(
         cls,
@@ -97,11 +157,13 @@ class OfficialDocument(Base):
         related_to: str,
         session,
     ) -> "OfficialDocument":
-        document = session.query(cls).filter(
-            cls.url == url,
-            cls.tree_id == tree_id,
-            cls.related_unit_uuids.contains(related_to)
-        ).first()
+        document = session.query(cls)\
+            .join(RelatedUnit, RelatedUnit.official_document_id == cls.id)\
+            .filter(
+                cls.url == url,
+                RelatedUnit.tree_id == tree_id,
+                RelatedUnit.unit_uuid == related_to,
+            ).first()
         if document:
             return document
 
@@ -110,29 +172,171 @@ class OfficialDocument(Base):
             cls.tree_id == tree_id,
         ).first()
         if document:
-            if related_to not in document.related_unit_uuids:
-                document.related_unit_uuids.append(related_to)
-                session.add(document)
+            document.relate_to(related_to)
         else:
             document = cls(
                 url=url,
                 tree_id=tree_id,
-                related_unit_uuids=[related_to],
             )
+            document.relate_to(related_to)
             session.add(document)
             session.flush()
 
-            similar_document = session.query(cls).filter(
-                cls.url == url,
-            ).first()
-            if similar_document:
-                for already_scrapped in similar_document.scrapped_documents:
-                    scrapped = ScrappedDocument(
-                        official_document_id=document.id,
-                        url=already_scrapped.url,
-                        text=already_scrapped.text,
-                        date=already_scrapped.date,
-                    )
-                    session.add(scrapped)
+            cls.__copy_scrapped_documents([document.id], session)
         session.flush()
         return document
+
+    @classmethod
+    def get_all(
+        cls,
+        related_urls: Iterable[tuple[str, str]],
+        tree_id: int,
+        session,
+        from_tree_id: Optional[int] = None,
+    ) -> dict[str, "OfficialDocument"]:
+        # Resuelve todas las urls (url, uuid relacionado) de un árbol en memoria y las escribe con un único flush
+        documents = {
+            document.url: document
+            for document in session.query(cls)
+            .options(selectinload(cls.related_units))
+            .filter(cls.tree_id == tree_id)
+        }
+        related = {url: set(document.related_unit_uuids) for url, document in documents.items()}
+        new_documents = []
+        new_related = []
+        for url, related_to in related_urls:
+            document = documents.get(url)
+            if document is None:
+                document = cls(
+                    url=url,
+                    tree_id=tree_id,
+                )
+                documents[url] = document
+                related[url] = set()
+                new_documents.append(document)
+            if related_to not in related[url]:
+                related[url].add(related_to)
+                new_related.append((document, related_to))
+
+        session.add_all(new_documents)
+        session.flush()
+        if new_related:
+            # Las relaciones no necesitan sus ids de vuelta: un único executemany
+            session.execute(insert(RelatedUnit), [
+                {"official_document_id": document.id, "tree_id": tree_id, "unit_uuid": unit_uuid}
+                for document, unit_uuid in new_related
+            ])
+            for document in {document for document, _ in new_related}:
+                session.expire(document, ["related_units"])
+        cls.__copy_scrapped_documents([document.id for document in new_documents], session, from_tree_id)
+        return documents
+
+    @classmethod
+    def carry_over(
+        cls,
+        previous_tree_id: int,
+        tree_id: int,
+        session,
+    ) -> set[str]:
+        # Trae del árbol anterior lo ya procesado para las mismas urls. Si un documento se relaciona con las mismas
+        # unidades, Finding llegaría a los mismos bloques, así que también se copian.
+        # Devuelve las unidades cuyos documentos se trajeron completos (su prompt sería el mismo).
+        previous_documents = {
+            document.url: document
+            for document in session.query(cls)
+            .options(selectinload(cls.related_units), selectinload(cls.scrapped_documents))
+            .filter(cls.tree_id == previous_tree_id)
+        }
+        previous_blocks = {}
+        for block in session.query(ScrappedBlock)\
+                .join(ScrappedDocument, ScrappedDocument.id == ScrappedBlock.scrapped_document_id)\
+                .join(cls, cls.id == ScrappedDocument.official_document_id)\
+                .filter(cls.tree_id == previous_tree_id)\
+                .order_by(ScrappedBlock.id):
+            previous_blocks.setdefault(block.scrapped_document_id, []).append(block)
+        documents = session.query(cls)\
+            .options(selectinload(cls.related_units), selectinload(cls.scrapped_documents))\
+            .filter(cls.tree_id == tree_id)\
+            .all()
+
+        carried_urls = set()
+        new_blocks = []
+        for document in documents:
+            previous_document = previous_documents.get(document.url)
+            if previous_document is None:
+                continue
+            document.processed = previous_document.processed
+            if set(document.related_unit_uuids) != set(previous_document.related_unit_uuids):
+                continue
+
+            scrapped_pairs = list(zip(
+                sorted(document.scrapped_documents, key=lambda scrapped: scrapped.id),
+                sorted(previous_document.scrapped_documents, key=lambda scrapped: scrapped.id),
+            ))
+            if (len(document.scrapped_documents) != len(previous_document.scrapped_documents) or
+                    any((scrapped.url, scrapped.date) != (previous_scrapped.url, previous_scrapped.date)
+                        for scrapped, previous_scrapped in scrapped_pairs)):
+                continue
+            carried_urls.add(document.url)
+            for scrapped, previous_scrapped in scrapped_pairs:
+                new_blocks.extend(
+                    {"scrapped_document_id": scrapped.id, "text": block.text, "unit_uuid": block.unit_uuid}
+                    for block in previous_blocks.get(previous_scrapped.id, [])
+                )
+        if new_blocks:
+            session.execute(insert(ScrappedBlock), new_blocks)
+        session.flush()
+
+        urls_by_unit = {}
+        for document in documents:
+            for unit_uuid in document.related_unit_uuids:
+                urls_by_unit.setdefault(unit_uuid, set()).add(document.url)
+        previous_urls_by_unit = {}
+        for document in previous_documents.values():
+            for unit_uuid in document.related_unit_uuids:
+                previous_urls_by_unit.setdefault(unit_uuid, set()).add(document.url)
+        return {unit_uuid
+                for unit_uuid, urls in urls_by_unit.items()
+                if previous_urls_by_unit.get(unit_uuid) == urls and urls <= carried_urls}
+
+    @classmethod
+    def __copy_scrapped_documents(
+        cls,
+        document_ids: list[int],
+        session,
+        from_tree_id: Optional[int] = None,
+    ) -> None:
+        # Reutiliza lo ya scrappeado para la misma url (en otro árbol) con un único INSERT ... SELECT.
+        # Si se indica un árbol de origen se prefiere su documento, si no el primero que se guardó.
+        if not document_ids:
+            return
+        new_document = aliased(cls)
+        similar_document_id = (
+            select(func.min(cls.id))
+            .where(cls.url == new_document.url)
+            .scalar_subquery()
+        )
+        if from_tree_id is not None:
+            similar_document_id = func.coalesce(
+                select(cls.id)
+                .where(cls.url == new_document.url, cls.tree_id == from_tree_id)
+                .scalar_subquery(),
+                similar_document_id,
+            )
+        already_scrapped = (
+            select(
+                new_document.id,
+                ScrappedDocument.url,
+                ScrappedDocument.text,
+                ScrappedDocument.date,
+            )
+            .join(ScrappedDocument, ScrappedDocument.official_document_id == similar_document_id)
+            .where(new_document.id.in_(document_ids))
+            .order_by(new_document.id, ScrappedDocument.id)
+        )
+        session.execute(
+            insert(ScrappedDocument).from_select(
+                ["official_document_id", "url", "text", "date"],
+                already_scrapped,
+            )
+        )
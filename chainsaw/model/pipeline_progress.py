@@ -0,0 +1,17 @@
+from sqlalchemy import ForeignKey, String, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from chainsaw.db import Base
+
+
+# Ítems ya procesados por cada paso del pipeline, confirmados en la misma transacción que sus escrituras
+class PipelineProgress(Base):
+    __tablename__ = "pipeline_progress"
+    __table_args__ = (
+        UniqueConstraint("step", "tree_id", "item_key", name="uq_pipeline_progress_step_tree_item"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    step: Mapped[str] = mapped_column(String, nullable=False)
+    tree_id: Mapped[int] = mapped_column(ForeignKey("trees.id"), nullable=False)
+    item_key: Mapped[str] = mapped_column(String, nullable=False)
+    tree = relationship("Tree", back_populates="pipeline_progress")
@@ -0,0 +1,66 @@
+from typing import Iterator, NamedTuple, Optional
+
+
+# Nodo desacoplado de la sesión: solo datos, sin estado de SQLAlchemy. En los cargos unit_class y range son None.
+# parent es la posición del padre dentro de TreeRecords.records (-1 para la raíz)
+class NodeRecord(NamedTuple):
+    uuid: str
+    name: str
+    type: str
+    unit_class: Optional[str]
+    range: Optional[str]
+    parent: int
+
+    @property
+    def is_unit(self) -> bool:
+        return self.unit_class is not None
+
+
+# Árbol de solo lectura para análisis: los registros siguen el orden BFS de la topología,
+# así que el padre siempre aparece antes que sus hijos. Se puede picklear y mandar a otros procesos.
+class TreeRecords:
+    __slots__ = ("tree_id", "records", "positions")
+
+    def __init__(self, tree_id: Optional[int], records: list[NodeRecord]) -> None:
+        self.tree_id = tree_id
+        self.records = records
+        self.positions = {record.uuid: position for position, record in enumerate(records)}
+
+    def __getstate__(self) -> tuple:
+        # Las posiciones se recalculan al deserializar, no hace falta mandarlas
+        return self.tree_id, self.records
+
+    def __setstate__(self, state: tuple) -> None:
+        self.__init__(*state)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __iter__(self) -> Iterator[NodeRecord]:
+        return iter(self.records)
+
+    def __contains__(self, uuid: str) -> bool:
+        return uuid in self.positions
+
+    def __getitem__(self, uuid: str) -> NodeRecord:
+        return self.records[self.positions[uuid]]
+
+    @property
+    def root(self) -> NodeRecord:
+        return self.records[0]
+
+    def units(self) -> list[NodeRecord]:
+        return [record for record in self.records if record.is_unit]
+
+    def parent_of(self, uuid: str) -> Optional[NodeRecord]:
+        parent = self[uuid].parent
+        return self.records[parent] if parent >= 0 else None
+
+    def path_to(self, uuid: str) -> list[NodeRecord]:
+        path = []
+        position = self.positions[uuid]
+        while position >= 0:
+            record = self.records[position]
+            path.append(record)
+            position = record.parent
+        return path[::-1]
@@ -0,0 +1,83 @@
+import os
+import threading
+from typing import Optional
+from collections import OrderedDict
+from chainsaw.bime import bime_stem
+from chainsaw.db import SessionLocal
+from chainsaw.model.tree import Tree
+
+
+TREE_REGISTRY_SIZE = int(os.getenv("TREE_REGISTRY_SIZE", 4))
+
+
+# Árboles ya cargados y desvinculados de su sesión, compartidos por todo el proceso (LRU)
+class TreeRegistry:
+    __trees: OrderedDict[tuple[str, bool, bool], Tree] = OrderedDict()
+    __lock = threading.Lock()
+
+    @classmethod
+    def __key_for(
+        cls,
+        path_file: str,
+        central_administration_only: bool,
+        units_only: bool,
+    ) -> tuple[str, bool, bool]:
+        return bime_stem(path_file), central_administration_only, units_only
+
+    @classmethod
+    def get(
+        cls,
+        path_file: str,
+        central_administration_only: bool = True,
+        incremental: bool = False,
+        units_only: bool = False,
+    ) -> Tree:
+        key = cls.__key_for(path_file, central_administration_only, units_only)
+        with cls.__lock:
+            try:
+                cls.__trees.move_to_end(key)
+                return cls.__trees[key]
+            except KeyError:
+                pass
+
+        tree = cls.__load(path_file, central_administration_only, incremental, units_only)
+        with cls.__lock:
+            cls.__trees[key] = tree
+            cls.__trees.move_to_end(key)
+            while len(cls.__trees) > TREE_REGISTRY_SIZE:
+                cls.__trees.popitem(last=False)
+        return tree
+
+    @classmethod
+    def __load(
+        cls,
+        path_file: str,
+        central_administration_only: bool,
+        incremental: bool,
+        units_only: bool,
+    ) -> Tree:
+        with SessionLocal() as session:
+            tree = Tree.load_or_create(
+                path_file,
+                session,
+                central_administration_only=central_administration_only,
+                incremental=incremental,
+                units_only=units_only,
+            )
+            session.refresh(tree)
+            tree.load_nodes()
+        return tree
+
+    @classmethod
+    def invalidate(
+        cls,
+        path_file: Optional[str] = None,
+        central_administration_only: Optional[bool] = None,
+    ) -> None:
+        with cls.__lock:
+            if path_file is None:
+                cls.__trees.clear()
+                return
+            for scope in ((True, False) if central_administration_only is None else (central_administration_only,)):
+                for units_only in (True, False):
+                    cls.__trees.pop(cls.__key_for(path_file, scope, units_only), None)
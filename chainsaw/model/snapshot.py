@@ -0,0 +1,61 @@
+import os
+import pickle
+import hashlib
+from pathlib import Path
+from typing import NamedTuple, Optional
+from chainsaw.db import BASE_DIR
+from chainsaw.bime import bime_stem
+
+
+SNAPSHOTS_PATH = os.path.join(BASE_DIR, "data", "snapshots")
+SNAPSHOT_VERSION = 1
+
+
+# Copia en disco de todo lo necesario para reabrir un árbol sin reconstruirlo desde la base.
+# Las listas de atributos siguen el orden de los uuids de la topología.
+class TreeSnapshot(NamedTuple):
+    topology: bytes
+    names: list[str]
+    types: list[str]
+    unit_classes: list[str]
+    ranges: list[str]
+    paths: list[str]
+
+    @classmethod
+    def content_hash_of(cls, path_file: str) -> Optional[str]:
+        # El snapshot se identifica por el contenido del CSV: sin el archivo no hay snapshot posible
+        try:
+            with Path(path_file).open("rb") as file:
+                return hashlib.file_digest(file, "sha256").hexdigest()
+        except FileNotFoundError:
+            return None
+
+    @classmethod
+    def __file_for(cls, path_file: str, central_administration_only: bool, content_hash: str) -> Path:
+        return Path(SNAPSHOTS_PATH) / f"{cls.__prefix_for(path_file, central_administration_only)}{content_hash[:16]}.pickle"
+
+    @classmethod
+    def __prefix_for(cls, path_file: str, central_administration_only: bool) -> str:
+        scope = "central" if central_administration_only else "full"
+        return f"{bime_stem(path_file)}_{scope}_v{SNAPSHOT_VERSION}_"
+
+    @classmethod
+    def load(cls, path_file: str, central_administration_only: bool, content_hash: str) -> Optional["TreeSnapshot"]:
+        snapshot_file = cls.__file_for(path_file, central_administration_only, content_hash)
+        if not snapshot_file.exists():
+            return None
+        with snapshot_file.open("rb") as file:
+            return cls(*pickle.load(file))
+
+    def save(self, path_file: str, central_administration_only: bool, content_hash: str) -> None:
+        snapshot_file = self.__file_for(path_file, central_administration_only, content_hash)
+        # Si el CSV cambió (y el árbol se volvió a armar), el snapshot anterior ya no sirve
+        self.invalidate(path_file, central_administration_only)
+        snapshot_file.parent.mkdir(parents=True, exist_ok=True)
+        with snapshot_file.open("wb") as file:
+            pickle.dump(tuple(self), file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def invalidate(cls, path_file: str, central_administration_only: bool) -> None:
+        for snapshot_file in Path(SNAPSHOTS_PATH).glob(f"{cls.__prefix_for(path_file, central_administration_only)}*.pickle"):
+            snapshot_file.unlink(missing_ok=True)
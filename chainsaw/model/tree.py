@@ -1,25 +1,37 @@
+import os
 import re
-import csv
 import uuid
+import numpy as np
 import pandas as pd
 import networkx as nx
-from typing import Optional, List, Union
-from tqdm import tqdm
+from typing import Optional, List, Union, Sequence, Iterable
 from copy import copy
-from pathlib import Path
-from sqlalchemy import String, ForeignKey, Integer, Boolean, UniqueConstraint
+from itertools import repeat
+from concurrent.futures import ProcessPoolExecutor
+from sqlalchemy import String, ForeignKey, Integer, Boolean, LargeBinary, UniqueConstraint, literal
 from sqlalchemy.orm import (
     Mapped,
+    lazyload,
     relationship,
     mapped_column,
+    object_session,
+    selectinload,
 )
 
 from chainsaw.db import Base
+from chainsaw.bime import BIMEReader, bime_stem
 from chainsaw.enum.field import Field
 from chainsaw.enum.administration_type import AdministrationType
+from chainsaw.model.indexes import FacetIndex, LowestCommonAncestorIndex, TreeArrays, TreeTopology
+from chainsaw.model.records import NodeRecord, TreeRecords
+from chainsaw.model.snapshot import TreeSnapshot
+from chainsaw.model.pipeline_progress import PipelineProgress
 from chainsaw.model.tree_change import TreeChange
 from chainsaw.model.node import Node, Unit, Charge
-from chainsaw.model.official_document import OfficialDocument, Objective
+from chainsaw.model.official_document import OfficialDocument, Objective, Prompt
+
+
+TREE_BUILD_WORKERS = int(os.getenv("TREE_BUILD_WORKERS", 1))
 
 
 class Edge(Base):
@@ -43,6 +55,9 @@ class Tree(Base):
     date_string: Mapped[str] = mapped_column(String, unique=False, index=True)
     root_uuid: Mapped[str] = mapped_column(String(36), unique=False, index=False)
     central_administration_only: Mapped[bool] = mapped_column(Boolean, unique=False, index=False)
+    topology: Mapped[Optional[bytes]] = mapped_column(LargeBinary, nullable=True)
+    # sha256 del CSV con el que se armó el árbol (vacío en árboles anteriores a registrarlo)
+    content_hash: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
     units: Mapped[List[Unit]] = relationship(
         "Unit",
         back_populates="tree",
@@ -68,38 +83,205 @@ class Tree(Base):
         back_populates="tree",
         cascade="all, delete-orphan"
     )
+    pipeline_progress: Mapped[List[PipelineProgress]] = relationship(
+        "PipelineProgress",
+        back_populates="tree",
+        cascade="all, delete-orphan"
+    )
+    changes_as_old: Mapped[List[TreeChange]] = relationship(
+        "TreeChange",
+        foreign_keys=[TreeChange.tree_id_2023],
+        cascade="all, delete-orphan",
+    )
+    changes_as_new: Mapped[List[TreeChange]] = relationship(
+        "TreeChange",
+        foreign_keys=[TreeChange.tree_id_2025],
+        cascade="all, delete-orphan",
+    )
 
     ROOT_NAME = "Presidencia de la Nación"
+    # Solo unidades: sin cargos en el grafo ni en memoria (clustering, heatmaps y el pipeline no los usan)
+    __units_only = False
 
     @property
     def nodes(self):
+        if self.__units_only:
+            return self.units
         return self.units + self.charges
 
+    @property
+    def units_only(self) -> bool:
+        return self.__units_only
+
+    def __use_units_only(self, units_only: bool) -> None:
+        if units_only == self.__units_only:
+            return
+        self.__units_only = units_only
+        try:
+            # El grafo ya cargado (y todo lo derivado de él) no corresponde al nuevo modo:
+            # se descarta entero y se vuelve a armar cuando se necesite, con o sin cargos
+            del self.__graph
+        except AttributeError:
+            pass
+        self.__reset_index()
+
     @property
     def graph(self):
         try:
             __graph__ = self.__graph
             return __graph__
         except AttributeError:
+            if self.topology is not None:
+                self.__load_topology(TreeTopology.from_bytes(self.topology))
+                return self.__graph
+
             __graph__ = nx.DiGraph()
             for node in self.nodes:
                 __graph__.add_node(node.uuid, node=node)
             for edge in self.edges:
-                __graph__.add_edge(edge.source, edge.target)
+                if edge.target in __graph__:
+                    __graph__.add_edge(edge.source, edge.target)
             self.__graph = __graph__
+            self.__build_index()
             return self.__graph
 
+    def __load_topology(self, topology: TreeTopology) -> None:
+        # Solo la estructura: los Unit/Charge se traen de la base recién cuando se necesitan (ver node_at_uuid)
+        if self.__units_only:
+            topology = topology.only_units()
+        self.__graph = nx.DiGraph()
+        self.__graph.add_nodes_from(topology.uuids)
+        self.__graph.add_edges_from(topology.edges())
+        self.__reset_index()
+        for node_uuid, parent, is_unit in zip(topology.uuids, topology.parents, topology.units):
+            self.__index_node(
+                node_uuid,
+                topology.uuids[parent] if parent >= 0 else None,
+                is_unit=bool(is_unit),
+            )
+
+    def __load_snapshot(self, snapshot: TreeSnapshot) -> None:
+        topology = TreeTopology.from_bytes(snapshot.topology)
+        self.__load_topology(topology)
+        self.__names = {uuid: name
+                        for uuid, name in zip(topology.uuids, snapshot.names)
+                        if uuid in self.__graph}
+        self.__path_strings = {uuid: path
+                               for uuid, path in zip(topology.uuids, snapshot.paths)
+                               if uuid in self.__graph}
+        self.__attributes = {uuid: (node_type, unit_class, node_range)
+                             for uuid, node_type, unit_class, node_range
+                             in zip(topology.uuids, snapshot.types, snapshot.unit_classes, snapshot.ranges)
+                             if uuid in self.__graph}
+
+    def __restore_snapshot(self, path_file) -> None:
+        try:
+            self.__graph
+            return
+        except AttributeError:
+            pass
+
+        if self.content_hash is None:
+            # No se sabe de qué CSV salió el árbol: un snapshot a nombre de este podría no corresponderle
+            return
+        if (content_hash := TreeSnapshot.content_hash_of(path_file)) is None:
+            # Sin el CSV no se puede guardar: armar el snapshot sería trabajo tirado
+            return
+        if content_hash != self.content_hash:
+            raise ValueError(
+                f"{path_file} changed since tree {self.id} was built from it: delete the tree to rebuild it"
+            )
+        if (snapshot := TreeSnapshot.load(path_file, self.central_administration_only, content_hash)):
+            self.__load_snapshot(snapshot)
+        elif not self.__units_only:
+            # Un grafo sin cargos no sirve como snapshot del árbol completo
+            self.snapshot().save(path_file, self.central_administration_only, content_hash)
+
+    def as_topology(self) -> TreeTopology:
+        return TreeTopology.from_edges(
+            self.root_uuid,
+            self.graph.edges(),
+            {uuid for uuid, is_unit in self.__is_unit.items() if is_unit},
+        )
+
+    def snapshot(self) -> TreeSnapshot:
+        topology = self.as_topology()
+        nodes = [self.node_at_uuid(uuid) for uuid in topology.uuids]
+        return TreeSnapshot(
+            topology=topology.to_bytes(),
+            names=[node.name for node in nodes],
+            types=[node.type for node in nodes],
+            unit_classes=[getattr(node, "unit_class", "") for node in nodes],
+            ranges=[getattr(node, "range", "") for node in nodes],
+            paths=[self.formatted_path_to(uuid) for uuid in topology.uuids],
+        )
+
+    def __reset_index(self) -> None:
+        self.__names = {}
+        self.__parents = {}
+        self.__depths = {}
+        self.__jurisdiction_of = {}
+        self.__is_unit = {}
+        self.__name_paths = {}
+        self.__path_strings = {}
+        self.__lca_index = None
+        self.__arrays = None
+        self.__facets = None
+        self.__dataframe = None
+        self.__path_trie = None
+        self.__attributes = {}
+        self.__records = None
+
+    def __index_node(self, node_uuid: str, parent: Optional[str], is_unit: bool) -> None:
+        # Al ser un árbol alcanza con el padre de cada nodo para reconstruir cualquier path en O(profundidad)
+        self.__is_unit[node_uuid] = is_unit
+        if parent is None:
+            self.__parents[node_uuid] = None
+            self.__depths[node_uuid] = 0
+            self.__jurisdiction_of[node_uuid] = node_uuid
+        else:
+            self.__parents[node_uuid] = parent
+            self.__depths[node_uuid] = self.__depths[parent] + 1
+            if parent == self.root_uuid and is_unit:
+                self.__jurisdiction_of[node_uuid] = node_uuid
+            else:
+                self.__jurisdiction_of[node_uuid] = self.__jurisdiction_of[parent]
+
+    def __build_index(self) -> None:
+        self.__reset_index()
+        self.__index_node(self.root_uuid, None, is_unit=True)
+        for parent, child in nx.bfs_edges(self.__graph, self.root_uuid):
+            self.__index_node(child, parent, is_unit=self.node_at_uuid(child).__class__ == Unit)
+
+    def __name_path(self, target: str) -> tuple[str, ...]:
+        self.graph
+        try:
+            return self.__name_paths[target]
+        except KeyError:
+            parent = self.parent_of(target)
+            prefix = self.__name_path(parent) if parent is not None else ()
+            self.__name_paths[target] = prefix + (self.as_name(target),)
+            return self.__name_paths[target]
+
     @classmethod
     def load_or_create(
         cls,
         path_file,
         session,
         central_administration_only: bool = True,
+        workers: int = TREE_BUILD_WORKERS,
+        incremental: bool = False,
+        units_only: bool = False,
     ) -> "Tree":
-        if (existing_tree := session.query(Tree).filter_by(
-            date_string=Path(path_file).stem,
+        query = session.query(Tree)
+        if units_only:
+            query = query.options(selectinload(Tree.units), lazyload(Tree.charges))
+        if (existing_tree := query.filter_by(
+            date_string=bime_stem(path_file),
             central_administration_only=central_administration_only
         ).first()):
+            existing_tree.__use_units_only(units_only)
+            existing_tree.__restore_snapshot(path_file)
             return existing_tree
         else:
             try:
@@ -107,30 +289,21 @@ class Tree(Base):
                     path_file=path_file,
                     central_administration_only=central_administration_only,
                 )
+                tree.content_hash = TreeSnapshot.content_hash_of(path_file)
                 session.add(tree)
                 session.flush()
 
-                tree.__build_graph(path_file, session)
-                tree.units = [
-                    node
-                    for _, data in tree.graph.nodes(data=True)
-                    if (node := data.get("node"))
-                    and node.__class__ == Unit
-                ]
-                tree.charge = [
-                    node
-                    for _, data in tree.graph.nodes(data=True)
-                    if (node := data.get("node"))
-                    and node.__class__ == Charge
-                ]
-                edges = [
-                    Edge(source=source, target=target, tree=tree)
-                    for source, target in tree.graph.edges()
-                ]
-                for edge in edges:
-                    session.add(edge)
-                tree.edges = edges
+                previous_tree = tree.__previous_tree(session) if incremental else None
+                tree.__build_graph(path_file, workers)
+                tree.__persist(session, previous_tree)
+                snapshot = tree.snapshot()
                 session.commit()
+                if tree.content_hash is not None:
+                    snapshot.save(path_file, central_administration_only, tree.content_hash)
+                if units_only:
+                    # Se construye y persiste completo, pero en memoria quedan solo las unidades
+                    tree.__use_units_only(True)
+                    tree.__load_snapshot(snapshot)
                 return tree
             except FileNotFoundError:
                 raise FileNotFoundError(f"File not found: {path_file}")
@@ -141,7 +314,7 @@ class Tree(Base):
         central_administration_only: bool = True,
     ) -> None:
         self.path_file = path_file
-        self.date_string = Path(path_file).stem
+        self.date_string = bime_stem(path_file)
         self.central_administration_only = central_administration_only
         self.root_uuid = str(uuid.uuid5(uuid.NAMESPACE_URL, self.ROOT_NAME))
 
@@ -164,45 +337,188 @@ class Tree(Base):
         return len(self.__known_path_parts(data)) == 1
 
     def jurisdictions(self):
-        jurisdictions = self.graph.successors(self.root_uuid)
+        arrays = self.arrays
+        jurisdictions = arrays.uuids_at(arrays.children_of(arrays.index_of(self.root_uuid)))
         return [self.ROOT_NAME]+[self.as_name(uuid)
                                  for uuid in jurisdictions
-                                 if (node := self.graph.nodes[uuid]["node"])
-                                 and node.__class__ == Unit]
+                                 if self.jurisdiction_of(uuid) == uuid]
 
     def as_name(self, uuid: str) -> str:
-        return self.graph.nodes[uuid]["node"].name
+        self.graph
+        try:
+            return self.__names[uuid]
+        except KeyError:
+            return self.node_at_uuid(uuid).name
 
     def node_at_uuid(self, uuid: str) -> Node:
-        return self.graph.nodes[uuid].get('node')
+        attributes = self.graph.nodes[uuid]
+        if "node" not in attributes:
+            # Grafo cargado desde la topología: se asocian todas las unidades (o cargos) de una vez
+            self.__attach_nodes(self.units if self.__is_unit[uuid] else self.charges)
+        return attributes.get('node')
+
+    def __attach_nodes(self, nodes: list[Node]) -> None:
+        for node in nodes:
+            if node.uuid in self.__graph:
+                self.__graph.nodes[node.uuid]["node"] = node
+
+    def load_nodes(self) -> None:
+        # Deja cargados todos los Unit/Charge, para poder usar el árbol fuera de su sesión
+        self.graph
+        self.__attach_nodes(self.units)
+        if not self.__units_only:
+            self.__attach_nodes(self.charges)
+
+    def parent_of(self, uuid: str) -> Optional[str]:
+        self.graph
+        return self.__parents[uuid]
+
+    def depth_of(self, uuid: str) -> int:
+        self.graph
+        return self.__depths[uuid]
+
+    def jurisdiction_of(self, uuid: str) -> str:
+        self.graph
+        return self.__jurisdiction_of[uuid]
+
+    def is_unit(self, uuid: str) -> bool:
+        self.graph
+        return self.__is_unit[uuid]
+
+    def unit_uuids(self) -> list[str]:
+        self.graph
+        return [uuid for uuid in self.graph if self.__is_unit[uuid]]
 
     def uuid_path_to(self, target: str, source: Optional[str] = None) -> list[str]:
         __source__ = source if source is not None else self.root_uuid
-        return nx.shortest_path(self.graph, __source__, target)
+        self.graph
+        if target not in self.__parents:
+            raise nx.NodeNotFound(f"Target {target} is not in G")
+
+        path = [target]
+        while path[-1] != __source__:
+            parent = self.__parents[path[-1]]
+            if parent is None:
+                raise nx.NetworkXNoPath(f"No path between {__source__} and {target}.")
+            path.append(parent)
+        path.reverse()
+        return path
 
     def path_to(self, target: str, source: Optional[str] = None) -> list[str]:
-        return [self.as_name(part) for part in self.uuid_path_to(target, source=source)]
+        if source is None:
+            return list(self.__name_path(target))
+        uuid_path = self.uuid_path_to(target, source=source)
+        return list(self.__name_path(target)[-len(uuid_path):])
 
     def path_format(self, path: list[str]) -> str:
         return " -> ".join(path)
 
+    def formatted_path_to(self, target: str) -> str:
+        self.graph
+        try:
+            return self.__path_strings[target]
+        except KeyError:
+            self.__path_strings[target] = self.path_format(self.path_to(target))
+            return self.__path_strings[target]
+
+    @property
+    def arrays(self) -> TreeArrays:
+        # Índices enteros del árbol; self.graph queda como vista networkx por compatibilidad
+        self.graph
+        if self.__arrays is None:
+            self.__arrays = TreeArrays(self.as_topology())
+        return self.__arrays
+
+    @property
+    def facets(self) -> FacetIndex:
+        # Facetas de las unidades para filtros combinados y conteos agrupados
+        self.graph
+        if self.__facets is None:
+            units = self.as_records().units()
+            self.__facets = FacetIndex(self.arrays, [unit.uuid for unit in units], {
+                "unit_class": [unit.unit_class for unit in units],
+                "range": [unit.range for unit in units],
+                "type": [unit.type for unit in units],
+                "jurisdiction": [self.as_name(self.jurisdiction_of(unit.uuid)) for unit in units],
+                "depth": [self.depth_of(unit.uuid) for unit in units],
+            })
+        return self.__facets
+
+    @property
+    def lca_index(self) -> LowestCommonAncestorIndex:
+        self.graph
+        if self.__lca_index is None:
+            self.__lca_index = LowestCommonAncestorIndex(self.root_uuid, self.graph.succ)
+        return self.__lca_index
+
+    def lca(self, source: str, target: str) -> str:
+        return self.lca_index.lca(source, target)
+
+    def tree_distance(self, source: str, target: str) -> int:
+        return int(self.tree_distances([source], [target])[0])
+
+    def lcas(self, sources: Sequence[str], targets: Sequence[str]) -> list[str]:
+        index = self.lca_index
+        ancestors = index.lca_indices(index.indices_of(sources), index.indices_of(targets))
+        return [index.uuids[ancestor] for ancestor in ancestors]
+
+    def tree_distances(self, sources: Sequence[str], targets: Sequence[str]) -> np.ndarray:
+        index = self.lca_index
+        return index.distances(index.indices_of(sources), index.indices_of(targets))
+
+    @property
+    def path_trie(self) -> dict[tuple[str, str], str]:
+        # (uuid, nombre) -> uuid del siguiente nodo del path. Ante nombres repetidos gana el último hijo,
+        # y el nombre del propio nodo lo deja en el mismo lugar (así el path puede empezar por la raíz)
+        arrays = self.arrays
+        if self.__path_trie is None:
+            trie = {}
+            for parent, parent_uuid in enumerate(arrays.uuids):
+                for child_uuid in arrays.uuids_at(arrays.children_of(parent)):
+                    trie[(parent_uuid, self.as_name(child_uuid))] = child_uuid
+                trie[(parent_uuid, self.as_name(parent_uuid))] = parent_uuid
+            self.__path_trie = trie
+        return self.__path_trie
+
     def uuid_from_path(self, path: Union[list[str], str], separator: Optional[str] = ' -> ') -> str:
         if isinstance(path, str):
             path = path.split(separator)
-        assert path[0] == self.ROOT_NAME
+        if not path or path[0] != self.ROOT_NAME:
+            raise KeyError(f"Path does not start at {self.ROOT_NAME}: {path}")
+        trie = self.path_trie
         parent = self.root_uuid
         for part in path:
-            names = {self.as_name(uuid): uuid
-                     for uuid in self.graph.successors(parent)}
-            names[self.as_name(parent)] = parent
-            parent = names[part]
+            parent = trie[(parent, part)]
         return parent
 
+    def uuids_from_paths(
+        self,
+        paths: Iterable[Union[list[str], str, None]],
+        separator: Optional[str] = ' -> ',
+    ) -> list[Optional[str]]:
+        # Para columnas enteras: cada path distinto se resuelve una sola vez y los que no existen quedan en None
+        resolved = {}
+        uuids = []
+        for path in paths:
+            if isinstance(path, str):
+                key = tuple(path.split(separator))
+            elif isinstance(path, (list, tuple)):
+                key = tuple(path)
+            else:
+                uuids.append(None)
+                continue
+            if key not in resolved:
+                try:
+                    resolved[key] = self.uuid_from_path(list(key))
+                except KeyError:
+                    resolved[key] = None
+            uuids.append(resolved[key])
+        return uuids
+
     def descendant_uuids(self, parent_uuid: str) -> set[str]:
-        descendants = set(nx.descendants(self.graph, parent_uuid))
-        # La jurisdicción no se agrega a si misma como posible descendiente.
-        descendants.add(parent_uuid)
-        return descendants
+        # El subárbol incluye al propio nodo: la jurisdicción también es candidata
+        arrays = self.arrays
+        return set(arrays.uuids_at(arrays.subtree(arrays.index_of(parent_uuid))))
 
     def all_nodes_named(self, name: str, source: str) -> list[str]:
         descendants = self.descendant_uuids(source)
@@ -211,7 +527,7 @@ class Tree(Base):
                 if self.as_name(descendant_uuid) == name]
 
     def uuid_for(self, data: dict, parent: str, charge: bool = False) -> str:
-        path = self.path_to(parent)
+        path = [self.formatted_path_to(parent)]
         if charge:
             charge_name = Unit.get_field(data, Field.cargo)
             charge_order = Unit.get_field(data, Field.car_orden)
@@ -221,36 +537,22 @@ class Tree(Base):
             path.append(f"{charge_name} ({charge_order}) [{raw_norms}]: {last_name}, {first_name}")
         else:
             unit_name = Unit.get_field(data, Field.unidad)
-            if path[-1] != unit_name:
+            if self.as_name(parent) != unit_name:
                 path.append(unit_name)
         return str(uuid.uuid5(uuid.NAMESPACE_URL, self.path_format(path)))
 
-    def __build_official_documents(
-        self,
-        data: dict,
-        related_uuid: str,
-        session,
-    ) -> list[OfficialDocument]:
+    @classmethod
+    def __norm_urls(cls, data: dict) -> list[str]:
         raw_norms = Unit.get_field(data, Field.norma_competencias_objetivos)
         raw_norms = re.sub(r';{2,}', ';', raw_norms)
-        raw_norms = re.findall(
+        return re.findall(
             r'(https?.*?)(?=\)+\;+\[+|\)\;|\)\[|\)\(|\)\,|\)\:|\)?\s|\)?$|\;\[|\;$|\[|\])',
             raw_norms,
         )
 
-        return [
-            OfficialDocument.get(
-                url,
-                tree_id=self.id,
-                related_to=related_uuid,
-                session=session)
-            for url in raw_norms
-        ]
-
     def __add_node(
         self,
         data: dict,
-        session,
         parent: Optional[str],
         _uuid: Optional[str] = None,
     ) -> Unit:
@@ -259,94 +561,262 @@ class Tree(Base):
         else:
             unit_uuid = _uuid
 
-        unit = session.query(Unit).filter(
-            Unit.uuid == unit_uuid,
-            Unit.tree_id == self.id,
-        ).one_or_none()
+        return self.__attach(data, parent, unit_uuid)
+
+    def __attach(
+        self,
+        data: dict,
+        parent: Optional[str],
+        unit_uuid: str,
+        charge_uuid: Optional[str] = None,
+    ) -> Unit:
+        # El árbol se construye completo en memoria, sin consultar la base por cada fila
+        unit = self.node_at_uuid(unit_uuid) if unit_uuid in self.graph else None
         if not unit:
             unit = Unit(data, uuid=unit_uuid, tree_id=self.id)
             self.graph.add_node(unit.uuid, node=unit)
-            session.add(unit)
+            if parent is not None:
+                self.graph.add_edge(parent, unit.uuid)
+            self.__index_node(unit.uuid, parent, is_unit=True)
+            self.__index_unit(unit)
 
-        if not _uuid:
-            self.graph.add_edge(parent, unit.uuid)
-        session.flush()
+        if charge_uuid is None:
+            charge_uuid = self.uuid_for(data, unit.uuid, charge=True)
+        if self.__operations is not None:
+            self.__operations.append((data, parent, unit_uuid, charge_uuid))
 
-        self.__build_official_documents(
-            data,
-            unit.uuid,
-            session,
-        )
+        self.__pending_documents.append((data, unit.uuid))
         charge = Charge(
             data,
-            unit_id=unit.id,
-            uuid=self.uuid_for(data, unit.uuid, charge=True),
+            unit=unit,
+            uuid=charge_uuid,
             tree_id=self.id,
         )
         self.graph.add_node(charge.uuid, node=charge)
         self.graph.add_edge(unit.uuid, charge.uuid)
-        session.add(charge)
-        session.flush()
+        self.__index_node(charge.uuid, unit.uuid, is_unit=False)
         return unit
 
-    def as_dataframe(self) -> pd.DataFrame:
-        rows = []
-
-        for node in self.nodes:
-            if node is None:
-                continue
-
-            parent_uuid = None
-            predecessor_uuids = list(self.graph.predecessors(node.uuid))
-            if len(predecessor_uuids) > 1:
-                raise AssertionError(f"Too many predecessors for {node.uuid}")
-            elif len(predecessor_uuids) == 1:
-                parent_uuid = predecessor_uuids[0]
-            else:
-                parent_uuid = ""
+    def __index_unit(self, unit: Unit) -> None:
+        # Índice (jurisdicción, nombre) -> uuids, para no recorrer la jurisdicción completa por cada fila.
+        # El nombre es el mismo que devuelve Unit.get_field (sin espacios en los extremos) y se compara exacto
+        jurisdiction = self.__jurisdiction_of[unit.uuid]
+        self.__units_by_name.setdefault(unit.name, []).append(unit.uuid)
+        self.__units_by_jurisdiction_and_name.setdefault((jurisdiction, unit.name), []).append(unit.uuid)
+
+    def __units_named(self, name: str, jurisdiction: str) -> list[str]:
+        if jurisdiction == self.root_uuid:
+            return list(self.__units_by_name.get(name, []))
+        return list(self.__units_by_jurisdiction_and_name.get((jurisdiction, name), []))
+
+    def __previous_tree(self, session) -> Optional["Tree"]:
+        # Solo árboles anteriores: si no hay ninguno no se trae nada
+        return session.query(Tree)\
+            .filter(
+                Tree.id != self.id,
+                Tree.central_administration_only == self.central_administration_only,
+                Tree.date_string < self.date_string,
+            )\
+            .order_by(Tree.date_string.desc())\
+            .first()
+
+    def __persist(self, session, previous_tree: Optional["Tree"] = None) -> None:
+        # Un único flush: SQLAlchemy agrupa los INSERT de cada tabla en sentencias multi-fila
+        nodes = [node for _, node in self.graph.nodes(data="node")]
+        self.units = [node for node in nodes if node.__class__ == Unit]
+        self.charges = [node for node in nodes if node.__class__ == Charge]
+        self.edges = [
+            Edge(source=source, target=target)
+            for source, target in self.graph.edges()
+        ]
+        topology = self.as_topology()
+        self.topology = topology.to_bytes()
+        positions = topology.unit_positions()
+        for unit in self.units:
+            unit.materialized_path, unit.lft, unit.rgt, unit.depth, unit.jurisdiction_uuid = positions[unit.uuid]
+        session.flush()
 
-            rows.append({
-                "uuid": node.uuid,
-                "parent": parent_uuid,
-                "name": node.name,
-                "path": "<br>".join(self.path_to(node.uuid)),
-            })
+        OfficialDocument.get_all(
+            (
+                (url, unit_uuid)
+                for data, unit_uuid in self.__pending_documents
+                for url in self.__norm_urls(data)
+            ),
+            tree_id=self.id,
+            session=session,
+            from_tree_id=previous_tree.id if previous_tree else None,
+        )
+        self.__pending_documents = []
 
-        df = pd.DataFrame(rows)
-        return df
+        if previous_tree is not None:
+            # Modo incremental: lo ya scrappeado y consultado al LLM para unidades sin cambios no se vuelve a hacer
+            unchanged_uuids = OfficialDocument.carry_over(previous_tree.id, self.id, session)
+            Prompt.carry_over(unchanged_uuids, previous_tree.id, self.id, session)
 
-    def __build_graph(self, path_file, session) -> None:
+    def as_dataframe(self) -> pd.DataFrame:
+        self.graph
+        # El árbol se comparte (TreeRegistry): cada llamador recibe su propia copia para modificar
+        if self.__dataframe is not None:
+            return self.__dataframe.copy()
+
+        # Un único DFS: el path de cada nodo es el de su padre más su nombre
+        names = {}
+        paths = {}
+        for node_uuid in nx.dfs_preorder_nodes(self.graph, self.root_uuid):
+            names[node_uuid] = self.as_name(node_uuid)
+            parent_uuid = self.__parents[node_uuid]
+            paths[node_uuid] = (names[node_uuid]
+                                if parent_uuid is None
+                                else f"{paths[parent_uuid]}<br>{names[node_uuid]}")
+
+        uuids = ([node_uuid for node_uuid in self.graph if self.__is_unit[node_uuid]] +
+                 [node_uuid for node_uuid in self.graph if not self.__is_unit[node_uuid]])
+        self.__dataframe = pd.DataFrame({
+            "uuid": uuids,
+            "parent": [self.__parents[node_uuid] or "" for node_uuid in uuids],
+            "name": [names[node_uuid] for node_uuid in uuids],
+            "path": [paths[node_uuid] for node_uuid in uuids],
+        })
+        return self.__dataframe.copy()
+
+    def __node_attributes(self) -> dict[str, tuple[str, str, str]]:
+        # (tipo, clase, rango) por uuid, sin instanciar Unit/Charge si se puede evitar
+        if self.__attributes:
+            return self.__attributes
+        session = object_session(self)
+        if session is None or self.id is None:
+            for node_uuid in self.graph:
+                node = self.node_at_uuid(node_uuid)
+                self.__attributes[node_uuid] = (node.type,
+                                                getattr(node, "unit_class", ""),
+                                                getattr(node, "range", ""))
+            return self.__attributes
+
+        rows = session.query(Unit.uuid, Unit.name, Unit.type, Unit.unit_class, Unit.range)\
+            .filter(Unit.tree_id == self.id)\
+            .all()
+        if not self.__units_only:
+            rows += session.query(Charge.uuid, Charge.name, Charge.type, literal(""), literal(""))\
+                .filter(Charge.tree_id == self.id)\
+                .all()
+        for node_uuid, name, node_type, unit_class, node_range in rows:
+            if node_uuid in self.__graph:
+                self.__names.setdefault(node_uuid, name)
+                self.__attributes[node_uuid] = (node_type, unit_class, node_range)
+        return self.__attributes
+
+    def as_records(self) -> TreeRecords:
+        # Copia de solo lectura sin objetos ORM, para análisis o para mandar a otros procesos
+        self.graph
+        if self.__records is None:
+            topology = self.as_topology()
+            attributes = self.__node_attributes()
+            records = []
+            for node_uuid, parent, is_unit in zip(topology.uuids, topology.parents, topology.units):
+                node_type, unit_class, node_range = attributes[node_uuid]
+                records.append(NodeRecord(
+                    uuid=node_uuid,
+                    name=self.as_name(node_uuid),
+                    type=node_type,
+                    unit_class=unit_class if is_unit else None,
+                    range=node_range if is_unit else None,
+                    parent=int(parent),
+                ))
+            self.__records = TreeRecords(self.id, records)
+        return self.__records
+
+    def __start_graph(self) -> None:
         self.__graph = nx.DiGraph()
-        with Path(path_file).open("r", encoding="utf-8") as file:
-            total_rows = sum(1 for _ in file) - 2  # Descuento el header y la primer row, Presidencia
-
-        with Path(path_file).open("r", encoding="utf-8") as file:
-            reader = csv.reader(file)
-            next(reader)
-
+        self.__pending_documents = []
+        self.__operations = None
+        self.__reset_index()
+        self.__units_by_name = {}
+        self.__units_by_jurisdiction_and_name = {}
+
+    def __build_graph(self, path_file, workers: int = 1) -> None:
+        self.__start_graph()
+        administration_types = (
+            {AdministrationType.CENTRAL_ADMINISTRATION.value}
+            if self.central_administration_only
+            else None
+        )
+        with BIMEReader(path_file, administration_types) as rows:
+            # La primer row es Presidencia
+            root_data = next(rows)
             self.__add_node(
-                next(reader),
-                session=session,
+                root_data,
                 parent=None,
                 _uuid=self.root_uuid,
             )
 
+            if workers > 1:
+                self.__build_jurisdictions_in_parallel(root_data, rows, workers)
+                return
+
             current_jurisdiction = self.root_uuid
-            for data in tqdm(reader, total=total_rows, desc="Procesando nodos"):
-                if (
-                    not self.central_administration_only or
-                    Unit.get_field(data, Field.tipo_administracion) == AdministrationType.CENTRAL_ADMINISTRATION.value
-                ):
-                    current_jurisdiction = self.__process_node_data(
-                        data,
-                        session,
-                        current_jurisdiction,
-                    )
+            for data in rows:
+                current_jurisdiction = self.__process_node_data(
+                    data,
+                    current_jurisdiction,
+                )
+
+    def __build_jurisdictions_in_parallel(self, root_data: list[str], rows, workers: int) -> None:
+        # Cada jurisdicción solo busca a quién reporta dentro de su propio subárbol, así que se resuelven por separado.
+        # Las filas de jurisdicciones que ya existen no modifican nada en la construcción secuencial, se descartan.
+        segments = []
+        started = set()
+        for data in rows:
+            if self.__is_jurisdiction(data):
+                jurisdiction_uuid = self.uuid_for(data, self.root_uuid)
+                if jurisdiction_uuid in self.graph or jurisdiction_uuid in started:
+                    continue
+                started.add(jurisdiction_uuid)
+                segments.append([data])
+            elif segments:
+                segments[-1].append(data)
+            else:
+                # Antes de la primer jurisdicción se busca en todo el árbol, así que va en secuencial
+                self.__process_node_data(data, self.root_uuid)
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            resolved = executor.map(
+                Tree.resolve_jurisdiction,
+                repeat(self.path_file),
+                repeat(root_data),
+                segments,
+            )
+            # Se aplican en el orden del CSV: mismos uuids y mismo orden de inserción que en secuencial
+            for operations in resolved:
+                for operation in operations:
+                    self.__attach(*operation)
+
+    @classmethod
+    def resolve_jurisdiction(
+        cls,
+        path_file: str,
+        root_data: list[str],
+        rows: list[list[str]],
+    ) -> list[tuple[list[str], Optional[str], str, str]]:
+        tree = cls(path_file=path_file)
+        tree.__start_graph()
+        tree.__add_node(
+            root_data,
+            parent=None,
+            _uuid=tree.root_uuid,
+        )
+        tree.__operations = []
+
+        current_jurisdiction = tree.root_uuid
+        for data in rows:
+            current_jurisdiction = tree.__process_node_data(
+                data,
+                current_jurisdiction,
+            )
+        return tree.__operations
 
     def __process_node_data(
         self,
         data: dict,
-        session,
         current_jurisdiction: str,
     ) -> str:
         new_jurisdiction = current_jurisdiction
@@ -357,15 +827,14 @@ class Tree(Base):
             except KeyError:
                 unit = self.__add_node(
                     data,
-                    session=session,
                     parent=self.root_uuid,
                 )
                 new_jurisdiction = unit.uuid
         else:
             reports_name = Unit.get_field(data, Field.reporta_a)
-            candidates = self.all_nodes_named(
+            candidates = self.__units_named(
                 reports_name,
-                source=current_jurisdiction,
+                jurisdiction=current_jurisdiction,
             )
             if len(candidates) == 0:
                 # Esto no deberia pasar...
@@ -377,19 +846,17 @@ class Tree(Base):
                 duplicated[Field.unidad.value] = unit_name
                 duplicated[Field.reporta_a.value] = parent_name
 
-                grandparent_uuids = self.all_nodes_named(
+                grandparent_uuids = self.__units_named(
                     parent_name,
-                    source=current_jurisdiction,
+                    jurisdiction=current_jurisdiction,
                 )
                 assert len(grandparent_uuids) == 1
                 unit = self.__add_node(
                     duplicated,
-                    session=session,
                     parent=grandparent_uuids[0],
                 )
                 self.__add_node(
                     data,
-                    session=session,
                     parent=unit.uuid,
                 )
 
@@ -416,7 +883,6 @@ class Tree(Base):
                 candidate_uuid = candidates[0]
             self.__add_node(
                 data,
-                session=session,
                 parent=candidate_uuid,
             )
         return new_jurisdiction
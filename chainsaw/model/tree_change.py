@@ -1,4 +1,4 @@
-from sqlalchemy import String
+from sqlalchemy import String, ForeignKey
 from sqlalchemy import Enum as SQLEnum
 from sqlalchemy.orm import Mapped, mapped_column
 from chainsaw.db import Base
@@ -18,3 +18,6 @@ class TreeChange(Base):
     uuid_2025: Mapped[str | None] = mapped_column(String(36), nullable=True)
     path_2023: Mapped[str | None] = mapped_column(String, nullable=True)
     path_2025: Mapped[str | None] = mapped_column(String, nullable=True)
+    # Par de árboles del que salió la fila (los uuid5 se repiten entre árboles, no alcanzan para saberlo)
+    tree_id_2023: Mapped[int | None] = mapped_column(ForeignKey("trees.id"), nullable=True, index=True)
+    tree_id_2025: Mapped[int | None] = mapped_column(ForeignKey("trees.id"), nullable=True, index=True)
@@ -3,6 +3,7 @@ from tqdm import tqdm
 from typing import List, override
 from chainsaw.model.tree import Tree
 from chainsaw.pipeline.step import PipelineStep
+from chainsaw.pipeline.writer import BatchWriter
 from chainsaw.model.official_document import (
     OfficialDocument,
     ScrappedDocument,
@@ -43,10 +44,19 @@ class Cleaning(PipelineStep):
             .join(
                 OfficialDocument, ScrappedDocument.official_document_id == OfficialDocument.id
             )\
-            .filter(OfficialDocument.tree_id == tree.id).all()
+            .filter(OfficialDocument.tree_id == tree.id)
 
-        for document in tqdm(documents, total=len(documents), desc="Normalizando documentos"):
-            document.text = self.__clean(document.text)
-            session.add(document)
-            session.commit()
+        with BatchWriter(session, "cleaning", tree.id) as writer:
+            # Los documentos ya limpiados en una corrida anterior no se vuelven a limpiar
+            completed = writer.completed()
+            for document in tqdm(
+                self._stream(session, documents, ScrappedDocument.id),
+                total=documents.count(),
+                desc="Normalizando documentos",
+            ):
+                if str(document.id) in completed:
+                    continue
+                document.text = self.__clean(document.text)
+                writer.add(document)
+                writer.done(document.id)
         session.close()
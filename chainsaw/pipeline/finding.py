@@ -1,14 +1,17 @@
 import re
 from tqdm import tqdm
 from typing import List, Dict, override
-from sqlalchemy.orm import selectinload
+from sqlalchemy import exists
 from chainsaw.model.node import Unit
 from chainsaw.model.tree import Tree
-from chainsaw.pipeline.step import PipelineStep
+from chainsaw.pipeline.step import PipelineStep, PIPELINE_PAGE_SIZE
+from chainsaw.pipeline.writer import BatchWriter
 from chainsaw.pipeline.constants import KEY_PHRASES
 from chainsaw.model.official_document import (
     OfficialDocument,
+    RelatedUnit,
     ScrappedBlock,
+    ScrappedDocument,
 )
 
 
@@ -61,7 +64,7 @@ class Finding(PipelineStep):
     @classmethod
     def __build_blocks(
         cls,
-        session,
+        writer: BatchWriter,
         scrapped_document_id: int,
         paragraphs: List[str],
         unit_paragraph_idxs: Dict[int, int],
@@ -92,8 +95,7 @@ class Finding(PipelineStep):
                 unit_uuid=unit_paragraph_idxs[start_idx],
                 scrapped_document_id=scrapped_document_id,
             )
-            session.add(scrapped_block)
-            session.commit()
+            writer.add(scrapped_block)
 
     @override
     def _execute(
@@ -103,29 +105,45 @@ class Finding(PipelineStep):
         _: List[str],
     ):
         session = self._session_on(db_url)
-        documents = session.query(OfficialDocument)\
-            .options(selectinload(OfficialDocument.scrapped_documents))\
-            .filter(OfficialDocument.tree_id == tree.id)\
-            .all()
-
-        for document in tqdm(documents, total=len(documents), desc="Descubriendo párrafos relevantes"):
-            names_by_uuid = {unit_uuid: session.query(Unit.name)
-                             .filter(
-                                Unit.tree_id == tree.id,
-                                Unit.uuid == unit_uuid)
-                             .one()[0]
-                             for unit_uuid in document.related_unit_uuids}
-
-            for scrapped in document.scrapped_documents:
+        related_names = session.query(RelatedUnit.official_document_id, RelatedUnit.unit_uuid, Unit.name)\
+            .join(
+                Unit,
+                (Unit.tree_id == RelatedUnit.tree_id) & (Unit.uuid == RelatedUnit.unit_uuid))\
+            .filter(RelatedUnit.tree_id == tree.id)\
+            .order_by(RelatedUnit.id)\
+            .yield_per(PIPELINE_PAGE_SIZE)
+        names_by_document = {}
+        for document_id, unit_uuid, unit_name in related_names:
+            names_by_document.setdefault(document_id, {})[unit_uuid] = unit_name
+
+        # Los documentos que ya tienen bloques (por ejemplo, traídos de un árbol anterior) no se vuelven a procesar
+        scrapped_documents = session.query(ScrappedDocument)\
+            .join(OfficialDocument, OfficialDocument.id == ScrappedDocument.official_document_id)\
+            .filter(
+                OfficialDocument.tree_id == tree.id,
+                ~exists().where(ScrappedBlock.scrapped_document_id == ScrappedDocument.id),
+            )
+
+        with BatchWriter(session, "finding", tree.id) as writer:
+            # También se saltean los documentos ya recorridos que no generaron bloques
+            completed = writer.completed()
+            for scrapped in tqdm(
+                self._stream(session, scrapped_documents, ScrappedDocument.id),
+                total=scrapped_documents.count(),
+                desc="Descubriendo párrafos relevantes",
+            ):
+                if str(scrapped.id) in completed:
+                    continue
                 paragraphs = scrapped.text.split("\n")
                 unit_paragraph_idxs = self.__get_unit_paragraphs_mapping(
-                    names_by_uuid,
+                    names_by_document.get(scrapped.official_document_id, {}),
                     paragraphs,
                 )
                 self.__build_blocks(
-                    session,
+                    writer,
                     scrapped.id,
                     paragraphs,
                     unit_paragraph_idxs,
                 )
+                writer.done(scrapped.id)
         session.close()
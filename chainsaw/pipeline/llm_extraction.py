@@ -1,8 +1,11 @@
 import os
 import time
+import queue
 import ollama
+import threading
 from tqdm import tqdm
 from multiprocessing import Pool
+from sqlalchemy import insert, update
 from openai import OpenAI, APIStatusError
 from typing import List, Optional, override
 from chainsaw.model.tree import Tree
@@ -13,6 +16,7 @@ from chainsaw.model.official_document import (
     Objective,
 )
 from chainsaw.pipeline.step import PipelineStep
+from chainsaw.pipeline.writer import PIPELINE_BATCH_SIZE, PIPELINE_BATCH_SECONDS
 from chainsaw.pipeline.constants import UNIT_NOT_FOUND
 
 
@@ -63,30 +67,71 @@ class LLMExtraction(PipelineStep):
     @classmethod
     def _execute_prompt(
         cls,
-        db_url: str,
         prompt: Prompt,
-    ) -> None:
+    ) -> tuple[int, Optional[LLMResult]]:
+        # Los procesos solo consultan al modelo: los Objective los guarda un único escritor en el proceso principal
         try:
-            session = cls._session_on(db_url)
-            persisted_prompt = session.query(Prompt).filter(Prompt.id == prompt.id).one()
             time.sleep(SECONDS_TO_SLEEP)
-
-            if (llm_result := PromptExecutor.execute(persisted_prompt)):
-                if persisted_prompt.objective is not None:
-                    persisted_prompt.objective.text = llm_result.text
-                    persisted_prompt.objective.urls = llm_result.urls
-                else:
-                    objective = Objective(
-                        text=llm_result.text,
-                        urls=llm_result.urls,
-                        prompt_id=persisted_prompt.id,
-                    )
-                    session.add(objective)
-                session.commit()
-            session.close()
+            return prompt.id, PromptExecutor.execute(prompt)
         except Exception as e:
             raise Exception(f"{prompt.unit_uuid}: {str(e)}")
 
+    @classmethod
+    def __save_objectives(
+        cls,
+        session,
+        results: dict[int, LLMResult],
+    ) -> None:
+        if not results:
+            return
+        existing = dict(session.query(Objective.prompt_id, Objective.id)
+                        .filter(Objective.prompt_id.in_(results))
+                        .all())
+        updates = [{"id": existing[prompt_id], "text": result.text, "urls": result.urls}
+                   for prompt_id, result in results.items()
+                   if prompt_id in existing]
+        inserts = [{"prompt_id": prompt_id, "text": result.text, "urls": result.urls}
+                   for prompt_id, result in results.items()
+                   if prompt_id not in existing]
+        if updates:
+            session.execute(update(Objective), updates)
+        if inserts:
+            session.execute(insert(Objective), inserts)
+        session.commit()
+
+    @classmethod
+    def __write_objectives(
+        cls,
+        db_url: str,
+        results: queue.Queue,
+        errors: list[Exception],
+    ) -> None:
+        # Junta los resultados que van llegando y los guarda cada PIPELINE_BATCH_SIZE o PIPELINE_BATCH_SECONDS.
+        # Un None en la cola indica que no llegan más
+        session = cls._session_on(db_url)
+        pending = {}
+        started = time.monotonic()
+        try:
+            while True:
+                try:
+                    item = results.get(timeout=PIPELINE_BATCH_SECONDS)
+                except queue.Empty:
+                    item = ()
+                if item is None:
+                    break
+                if item:
+                    prompt_id, llm_result = item
+                    pending[prompt_id] = llm_result
+                if len(pending) >= PIPELINE_BATCH_SIZE or time.monotonic() - started >= PIPELINE_BATCH_SECONDS:
+                    cls.__save_objectives(session, pending)
+                    pending = {}
+                    started = time.monotonic()
+            cls.__save_objectives(session, pending)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            session.close()
+
     @override
     def _execute(
         self,
@@ -101,12 +146,29 @@ class LLMExtraction(PipelineStep):
                 Prompt.unit_uuid.in_(uuids)
             )\
             .all()
+        session.close()
 
-        args = [(db_url, prompt) for prompt in prompts]
+        results = queue.Queue()
+        errors = []
+        # El pool se crea antes que el hilo escritor: los hijos no heredan un hilo (ni su conexión) a medio usar
         with Pool(processes=self.processes_amount) as pool:
-            for _ in tqdm(
-                pool.starmap(self._execute_prompt, args),
-                total=len(prompts),
-                desc=f"Evaluando prompts para extraer objetivos mediante {LLM_MODEL_NAME}",
-            ):
-                pass
+            writer = threading.Thread(target=self.__write_objectives, args=(db_url, results, errors))
+            writer.start()
+            try:
+                for prompt_id, llm_result in tqdm(
+                    pool.imap_unordered(self._execute_prompt, prompts),
+                    total=len(prompts),
+                    desc=f"Evaluando prompts para extraer objetivos mediante {LLM_MODEL_NAME}",
+                ):
+                    if errors or not writer.is_alive():
+                        # Si no se pueden guardar los resultados no tiene sentido seguir consultando al LLM
+                        pool.terminate()
+                        break
+                    if llm_result is not None:
+                        results.put((prompt_id, llm_result))
+            finally:
+                # Aunque falle un prompt, lo que ya llegó se guarda antes de propagar el error
+                results.put(None)
+                writer.join()
+        if errors:
+            raise errors[0]
@@ -6,11 +6,12 @@ from chainsaw.model.tree import Tree
 from chainsaw.model.node import Unit
 from chainsaw.model.official_document import (
     Prompt,
-    OfficialDocument,
+    RelatedUnit,
     ScrappedDocument,
     ScrappedBlock,
 )
 from chainsaw.pipeline.step import PipelineStep
+from chainsaw.pipeline.writer import BatchWriter
 from chainsaw.pipeline.constants import (
     UNIT_NOT_FOUND,
     DOCUMENT_DATE,
@@ -53,20 +54,20 @@ class Prompting(PipelineStep):
     def __create_prompt_for(
         cls,
         unit: Unit,
-        session,
+        writer: BatchWriter,
     ) -> None:
-        blocks = session.query(ScrappedBlock)\
+        blocks = writer.session.query(ScrappedBlock)\
             .options(selectinload(ScrappedBlock.scrapped_document)
                      .selectinload(ScrappedDocument.official_document))\
             .join(
                 ScrappedDocument,
                 (ScrappedDocument.id == ScrappedBlock.scrapped_document_id))\
             .join(
-                OfficialDocument,
-                (OfficialDocument.id == ScrappedDocument.official_document_id))\
+                RelatedUnit,
+                (RelatedUnit.official_document_id == ScrappedDocument.official_document_id))\
             .filter(
-                OfficialDocument.tree_id == unit.tree_id,
-                OfficialDocument.related_unit_uuids.contains(unit.uuid),
+                RelatedUnit.tree_id == unit.tree_id,
+                RelatedUnit.unit_uuid == unit.uuid,
                 ScrappedBlock.unit_uuid == unit.uuid,
             )\
             .all()
@@ -88,8 +89,9 @@ class Prompting(PipelineStep):
                 unit_uuid=unit.uuid,
                 tree_id=unit.tree_id,
             )
-            session.add(prompt)
-            session.commit()
+            writer.add(prompt)
+        # Sin registro de avance: una unidad sin prompt puede tenerlo cuando aparezcan nuevos bloques
+        writer.done()
 
     @override
     def _execute(
@@ -114,6 +116,7 @@ class Prompting(PipelineStep):
             )\
             .all()
 
-        for unit in tqdm(units, total=len(units), desc="Generando prompts"):
-            self.__create_prompt_for(unit, session)
+        with BatchWriter(session, "prompting", tree.id) as writer:
+            for unit in tqdm(units, total=len(units), desc="Generando prompts"):
+                self.__create_prompt_for(unit, writer)
         session.close()
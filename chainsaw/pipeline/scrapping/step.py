@@ -6,6 +6,7 @@ import undetected_chromedriver as uc
 
 from chainsaw.model.tree import Tree
 from chainsaw.pipeline.step import PipelineStep
+from chainsaw.pipeline.writer import BatchWriter
 from chainsaw.pipeline.constants import KEY_PHRASES
 from chainsaw.pipeline.scrapping.scrappers import OfficialDocumentScrapper
 from chainsaw.model.official_document import (
@@ -57,7 +58,7 @@ class Scrapping(PipelineStep):
     def __scrapping_document(
         cls,
         document: OfficialDocument,
-        session,
+        writer: BatchWriter,
         driver,
     ) -> None:
         if len(document.scrapped_documents) == 0 and not document.processed:
@@ -73,9 +74,11 @@ class Scrapping(PipelineStep):
                         text=scrapped_info.text,
                         date=scrapped_info.date,
                     )
-                    session.add(scrapped)
+                    writer.add(scrapped)
             document.processed = True
-            session.commit()
+            writer.add(document)
+        # La marca processed del documento ya registra el avance
+        writer.done()
 
     @override
     def _execute(
@@ -89,12 +92,17 @@ class Scrapping(PipelineStep):
 
         documents = session.query(OfficialDocument).filter(
             OfficialDocument.tree_id == tree.id,
-            OfficialDocument.processed.is_(False)).all()
-        for document in tqdm(documents, total=len(documents), desc="Scrappeando documentos"):
-            self.__scrapping_document(
-                document,
-                session,
-                driver,
-            )
+            OfficialDocument.processed.is_(False))
+        with BatchWriter(session, "scrapping", tree.id) as writer:
+            for document in tqdm(
+                self._stream(session, documents, OfficialDocument.id),
+                total=documents.count(),
+                desc="Scrappeando documentos",
+            ):
+                self.__scrapping_document(
+                    document,
+                    writer,
+                    driver,
+                )
         driver.quit()
         session.close()
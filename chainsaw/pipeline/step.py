@@ -1,13 +1,16 @@
+import os
 import re
 import unicodedata
 from pydantic import BaseModel
 from abc import ABC, abstractmethod
-from typing import List
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from typing import Iterator, List
+from chainsaw.db import EngineRegistry
 from chainsaw.model.tree import Tree
 
 
+PIPELINE_PAGE_SIZE = int(os.getenv("PIPELINE_PAGE_SIZE", 500))
+
+
 class PipelineStep(ABC, BaseModel):
     @abstractmethod
     def _execute(
@@ -20,9 +23,28 @@ class PipelineStep(ABC, BaseModel):
 
     @classmethod
     def _session_on(cls, db_url):
-        engine = create_engine(db_url)
-        SessionLocal = sessionmaker(bind=engine)
-        return SessionLocal()
+        # Los pasos confirman por lotes en medio de lo que recorren: si cada commit expirara la sesión,
+        # cada fila ya cargada volvería a consultarse a la base al tocarla (una consulta por fila)
+        return EngineRegistry.session_for(db_url, expire_on_commit=False)
+
+    @classmethod
+    def _stream(cls, session, query, key, page_size: int = PIPELINE_PAGE_SIZE) -> Iterator:
+        # Paginación por clave: cada página es una consulta nueva y ningún cursor queda abierto entre commits.
+        # Las filas de la página ya traídas sobreviven a los commits intermedios solo si la sesión no expira al
+        # confirmar (ver _session_on); si no, cada una se vuelve a consultar al tocarla.
+        # Al terminar una página sus filas se bajan a la base y se sacan de la sesión: la memoria no crece con el corpus
+        last = None
+        while True:
+            page_query = query if last is None else query.filter(key > last)
+            page = page_query.order_by(key).limit(page_size).all()
+            if not page:
+                return
+            yield from page
+            last = getattr(page[-1], key.key)
+            session.flush()
+            for row in page:
+                if row in session:
+                    session.expunge(row)
 
     @classmethod
     def _normalize_text(cls, text: str) -> str:
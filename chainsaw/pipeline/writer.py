@@ -0,0 +1,73 @@
+import os
+import time
+from typing import Optional
+from sqlalchemy import insert
+from chainsaw.model.pipeline_progress import PipelineProgress
+
+
+PIPELINE_BATCH_SIZE = int(os.getenv("PIPELINE_BATCH_SIZE", 200))
+PIPELINE_BATCH_SECONDS = float(os.getenv("PIPELINE_BATCH_SECONDS", 10))
+
+
+# Agrupa las escrituras de un paso del pipeline en transacciones de varios ítems: se confirma cada
+# PIPELINE_BATCH_SIZE filas o PIPELINE_BATCH_SECONDS segundos, siempre entre un ítem y el siguiente.
+# Los ítems terminados se registran en PipelineProgress dentro de la misma transacción que sus filas,
+# así que ante una caída se pierde a lo sumo el lote en curso y se retoma desde el último confirmado.
+class BatchWriter:
+    def __init__(
+        self,
+        session,
+        step: str,
+        tree_id: int,
+        batch_size: int = PIPELINE_BATCH_SIZE,
+        batch_seconds: float = PIPELINE_BATCH_SECONDS,
+    ) -> None:
+        self.session = session
+        self.step = step
+        self.tree_id = tree_id
+        self.batch_size = batch_size
+        self.batch_seconds = batch_seconds
+        self.__pending_rows = 0
+        self.__pending_items = []
+        self.__started = time.monotonic()
+
+    def __enter__(self) -> "BatchWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.commit()
+        else:
+            # El ítem que falló puede haber quedado a medias: se descarta el lote entero
+            self.session.rollback()
+
+    def completed(self) -> set[str]:
+        return {item_key for (item_key,) in self.session.query(PipelineProgress.item_key)
+                .filter(
+                    PipelineProgress.step == self.step,
+                    PipelineProgress.tree_id == self.tree_id,
+                )}
+
+    def add(self, *objects) -> None:
+        # Nuevos o ya persistidos: los cambios de estos últimos los detecta la sesión al confirmar
+        self.session.add_all(objects)
+        self.__pending_rows += len(objects)
+
+    def done(self, item_key: Optional[object] = None) -> None:
+        # Cierra un ítem; sin clave no queda registrado (el paso ya tiene su propia marca de avance)
+        if item_key is not None:
+            self.__pending_items.append(str(item_key))
+        if (self.__pending_rows + len(self.__pending_items) >= self.batch_size
+                or time.monotonic() - self.__started >= self.batch_seconds):
+            self.commit()
+
+    def commit(self) -> None:
+        if self.__pending_items:
+            self.session.execute(insert(PipelineProgress), [
+                {"step": self.step, "tree_id": self.tree_id, "item_key": item_key}
+                for item_key in self.__pending_items
+            ])
+        self.session.commit()
+        self.__pending_rows = 0
+        self.__pending_items = []
+        self.__started = time.monotonic()
@@ -0,0 +1,195 @@
+import numpy as np
+from typing import Optional
+from sqlalchemy import and_, insert, or_
+from rapidfuzz import fuzz, process, utils
+from chainsaw.model.tree import Tree
+from chainsaw.model.tree_change import TreeChange
+from chainsaw.enum.unit_status import UnitStatus
+
+
+# Clasifica cada unidad entre dos árboles. Las columnas *_2023 de TreeChange guardan el árbol anterior
+# y las *_2025 el nuevo.
+class TreeDiff:
+    NAME_WEIGHT = 0.7
+    MATCH_THRESHOLD = 80.0
+
+    def __init__(self, old_tree: Tree, new_tree: Tree) -> None:
+        self.old_tree = old_tree
+        self.new_tree = new_tree
+        self.__matches: Optional[dict[str, str]] = None
+
+    @classmethod
+    def __name_key(cls, name: str) -> str:
+        return " ".join(name.split()).casefold()
+
+    @property
+    def matches(self) -> dict[str, str]:
+        # uuid del árbol anterior -> uuid del nuevo
+        if self.__matches is None:
+            self.__matches = {}
+            old_units = sorted(self.old_tree.unit_uuids(), key=self.old_tree.depth_of)
+            new_units = self.new_tree.unit_uuids()
+
+            # 1. Mismo uuid5: mismo path de nombres
+            new_set = set(new_units)
+            for old_uuid in old_units:
+                if old_uuid in new_set:
+                    self.__matches[old_uuid] = old_uuid
+
+            # 2. Mismo nombre en otro lugar (si hay varios, el de path más parecido)
+            self.__match_exact_names(old_units, new_units)
+
+            # 3. Nombres y paths parecidos, comparando solo dentro de cada jurisdicción
+            self.__match_fuzzy(old_units, new_units)
+        return self.__matches
+
+    def __unmatched(self, old_units: list[str], new_units: list[str]) -> tuple[list[str], list[str]]:
+        matched = set(self.__matches.values())
+        return ([uuid for uuid in old_units if uuid not in self.__matches],
+                [uuid for uuid in new_units if uuid not in matched])
+
+    def __match_exact_names(self, old_units: list[str], new_units: list[str]) -> None:
+        old_pending, new_pending = self.__unmatched(old_units, new_units)
+        new_by_name = {}
+        for new_uuid in new_pending:
+            new_by_name.setdefault(self.__name_key(self.new_tree.as_name(new_uuid)), []).append(new_uuid)
+        old_by_name = {}
+        for old_uuid in old_pending:
+            key = self.__name_key(self.old_tree.as_name(old_uuid))
+            if key in new_by_name:
+                old_by_name.setdefault(key, []).append(old_uuid)
+
+        for key, old_group in old_by_name.items():
+            new_group = new_by_name[key]
+            if len(old_group) == 1 and len(new_group) == 1:
+                self.__matches[old_group[0]] = new_group[0]
+                continue
+            scores = process.cdist(
+                [self.__parent_path(self.old_tree, uuid) for uuid in old_group],
+                [self.__parent_path(self.new_tree, uuid) for uuid in new_group],
+                scorer=fuzz.token_sort_ratio,
+                processor=utils.default_process,
+            )
+            self.__assign(old_group, new_group, scores, threshold=0.0)
+
+    def __match_fuzzy(self, old_units: list[str], new_units: list[str]) -> None:
+        old_pending, new_pending = self.__unmatched(old_units, new_units)
+        # Primero las jurisdicciones, así el resto se puede agrupar por jurisdicción equivalente
+        self.__match_block(
+            [uuid for uuid in old_pending if self.old_tree.jurisdiction_of(uuid) == uuid],
+            [uuid for uuid in new_pending if self.new_tree.jurisdiction_of(uuid) == uuid],
+        )
+
+        old_pending, new_pending = self.__unmatched(old_units, new_units)
+        matched_jurisdictions = {self.__matches[uuid]
+                                 for uuid in self.__matches
+                                 if self.old_tree.jurisdiction_of(uuid) == uuid}
+        old_blocks = {}
+        for old_uuid in old_pending:
+            block = self.__matches.get(self.old_tree.jurisdiction_of(old_uuid))
+            old_blocks.setdefault(block, []).append(old_uuid)
+        new_blocks = {}
+        for new_uuid in new_pending:
+            jurisdiction = self.new_tree.jurisdiction_of(new_uuid)
+            block = jurisdiction if jurisdiction in matched_jurisdictions else None
+            new_blocks.setdefault(block, []).append(new_uuid)
+
+        for block, old_block in old_blocks.items():
+            if block in new_blocks:
+                self.__match_block(old_block, new_blocks[block])
+
+    def __match_block(self, old_block: list[str], new_block: list[str]) -> None:
+        if not old_block or not new_block:
+            return
+        name_scores = process.cdist(
+            [self.old_tree.as_name(uuid) for uuid in old_block],
+            [self.new_tree.as_name(uuid) for uuid in new_block],
+            scorer=fuzz.token_sort_ratio,
+            processor=utils.default_process,
+        )
+        path_scores = process.cdist(
+            [self.__parent_path(self.old_tree, uuid) for uuid in old_block],
+            [self.__parent_path(self.new_tree, uuid) for uuid in new_block],
+            scorer=fuzz.token_sort_ratio,
+            processor=utils.default_process,
+        )
+        scores = self.NAME_WEIGHT * name_scores + (1 - self.NAME_WEIGHT) * path_scores
+        self.__assign(old_block, new_block, scores, threshold=self.MATCH_THRESHOLD)
+
+    def __assign(self, old_block: list[str], new_block: list[str], scores: np.ndarray, threshold: float) -> None:
+        # Asignación greedy: primero los pares con mayor puntaje
+        rows, columns = np.nonzero(scores >= threshold)
+        order = np.argsort(-scores[rows, columns], kind="stable")
+        taken_rows = set()
+        taken_columns = set()
+        for row, column in zip(rows[order], columns[order]):
+            if row in taken_rows or column in taken_columns:
+                continue
+            taken_rows.add(row)
+            taken_columns.add(column)
+            self.__matches[old_block[row]] = new_block[column]
+
+    @classmethod
+    def __parent_path(cls, tree: Tree, uuid: str) -> str:
+        parent = tree.parent_of(uuid)
+        return tree.formatted_path_to(parent) if parent is not None else ""
+
+    def __status_for(self, old_uuid: str, new_uuid: str) -> UnitStatus:
+        if old_uuid == new_uuid:
+            return UnitStatus.EQUALS
+        old_parent = self.old_tree.parent_of(old_uuid)
+        same_parent = self.matches.get(old_parent) == self.new_tree.parent_of(new_uuid)
+        same_name = self.__name_key(self.old_tree.as_name(old_uuid)) == self.__name_key(self.new_tree.as_name(new_uuid))
+        if same_parent:
+            # Si solo cambió el nombre de algún ancestro la unidad sigue siendo la misma
+            return UnitStatus.EQUALS if same_name else UnitStatus.RENAMED
+        return UnitStatus.MOVED
+
+    def changes(self) -> list[dict]:
+        rows = []
+        for old_uuid in self.old_tree.unit_uuids():
+            new_uuid = self.matches.get(old_uuid)
+            rows.append({
+                "unit_name": self.old_tree.as_name(old_uuid),
+                "status": self.__status_for(old_uuid, new_uuid) if new_uuid else UnitStatus.DELETED,
+                "uuid_2023": old_uuid,
+                "uuid_2025": new_uuid,
+                "path_2023": self.old_tree.formatted_path_to(old_uuid),
+                "path_2025": self.new_tree.formatted_path_to(new_uuid) if new_uuid else None,
+            })
+        matched = set(self.matches.values())
+        for new_uuid in self.new_tree.unit_uuids():
+            if new_uuid not in matched:
+                rows.append({
+                    "unit_name": self.new_tree.as_name(new_uuid),
+                    "status": UnitStatus.NEW,
+                    "uuid_2023": None,
+                    "uuid_2025": new_uuid,
+                    "path_2023": None,
+                    "path_2025": self.new_tree.formatted_path_to(new_uuid),
+                })
+        return rows
+
+    def save(self, session) -> int:
+        # Reemplaza los cambios ya calculados para este par de árboles con un único INSERT
+        rows = [
+            {**row, "tree_id_2023": self.old_tree.id, "tree_id_2025": self.new_tree.id}
+            for row in self.changes()
+        ]
+        old_uuids = self.old_tree.unit_uuids()
+        new_uuids = self.new_tree.unit_uuids()
+        session.query(TreeChange)\
+            .filter(or_(
+                and_(TreeChange.tree_id_2023 == self.old_tree.id, TreeChange.tree_id_2025 == self.new_tree.id),
+                # Filas de antes de registrar los árboles: son de este par solo si todos sus uuids lo son
+                and_(
+                    TreeChange.tree_id_2023.is_(None),
+                    TreeChange.tree_id_2025.is_(None),
+                    or_(TreeChange.uuid_2023.is_(None), TreeChange.uuid_2023.in_(old_uuids)),
+                    or_(TreeChange.uuid_2025.is_(None), TreeChange.uuid_2025.in_(new_uuids)),
+                ),
+            ))\
+            .delete(synchronize_session=False)
+        session.execute(insert(TreeChange), rows)
+        session.commit()
+        return len(rows)
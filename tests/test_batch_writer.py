@@ -0,0 +1,94 @@
+import datetime
+import pytest
+from sqlalchemy import func
+from chainsaw.db import Base, EngineRegistry
+from chainsaw.model import OfficialDocument, Tree
+from chainsaw.model.official_document import ScrappedBlock, ScrappedDocument
+from chainsaw.model.pipeline_progress import PipelineProgress
+from chainsaw.pipeline.step import PipelineStep
+from chainsaw.pipeline.writer import BatchWriter
+
+
+DOCUMENTS = 25
+STEP = "test"
+
+
+class Interrupted(Exception):
+    pass
+
+
+@pytest.fixture
+def db_url(tmp_path):
+    db_url = f"sqlite:///{tmp_path / 'database.db'}"
+    engine = EngineRegistry.engine_for(db_url)
+    Base.metadata.create_all(engine)
+    with EngineRegistry.session_for(db_url) as session:
+        tree = Tree(path_file="2025_07_08.csv")
+        official_document = OfficialDocument(url="https://example.org", tree=tree)
+        session.add_all([tree, official_document] + [
+            ScrappedDocument(
+                official_document=official_document,
+                url=f"https://example.org/{i}",
+                text=f"Texto {i}",
+                date=datetime.date(2025, 7, 8),
+            )
+            for i in range(DOCUMENTS)
+        ])
+        session.commit()
+    yield db_url
+    engine.dispose()
+
+
+def run_step(db_url, fail_after=None) -> int:
+    # Un paso mínimo como los del pipeline: un bloque por documento, salteando los ya registrados
+    session = PipelineStep._session_on(db_url)
+    tree = session.query(Tree).one()
+    processed = 0
+    try:
+        with BatchWriter(session, STEP, tree.id, batch_size=4) as writer:
+            completed = writer.completed()
+            for document in PipelineStep._stream(
+                session, session.query(ScrappedDocument), ScrappedDocument.id, page_size=10
+            ):
+                if str(document.id) in completed:
+                    continue
+                if processed == fail_after:
+                    raise Interrupted
+                writer.add(ScrappedBlock(scrapped_document_id=document.id, text=document.text, unit_uuid="uuid"))
+                writer.done(document.id)
+                processed += 1
+    finally:
+        session.close()
+    return processed
+
+
+def test_interrupted_step_resumes_from_recorded_progress(db_url):
+    with pytest.raises(Interrupted):
+        run_step(db_url, fail_after=7)
+
+    with EngineRegistry.session_for(db_url) as session:
+        recorded = session.query(PipelineProgress).filter_by(step=STEP).count()
+        # Solo quedan los lotes confirmados, y sus filas con ellos: el lote en curso se descartó entero
+        assert 0 < recorded < 7
+        assert session.query(ScrappedBlock).count() == recorded
+
+    assert run_step(db_url) == DOCUMENTS - recorded
+
+    with EngineRegistry.session_for(db_url) as session:
+        blocks_per_document = session.query(func.count(ScrappedBlock.id))\
+            .group_by(ScrappedBlock.scrapped_document_id)\
+            .all()
+        assert len(blocks_per_document) == DOCUMENTS
+        assert all(count == 1 for (count,) in blocks_per_document)
+        assert session.query(PipelineProgress).filter_by(step=STEP).count() == DOCUMENTS
+
+    # Con todo registrado no queda nada por hacer
+    assert run_step(db_url) == 0
+
+
+def test_deleting_a_tree_deletes_its_progress(db_url):
+    run_step(db_url)
+    with EngineRegistry.session_for(db_url) as session:
+        session.delete(session.query(Tree).one())
+        session.commit()
+        assert session.query(PipelineProgress).count() == 0
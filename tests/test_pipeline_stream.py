@@ -0,0 +1,73 @@
+import datetime
+import pytest
+from sqlalchemy import event
+from chainsaw.db import Base, EngineRegistry
+from chainsaw.model import OfficialDocument, Tree
+from chainsaw.model.official_document import ScrappedDocument
+from chainsaw.pipeline.step import PipelineStep
+from chainsaw.pipeline.writer import BatchWriter
+
+
+DOCUMENTS = 30
+PAGE_SIZE = 10
+
+
+@pytest.fixture
+def db_url(tmp_path):
+    db_url = f"sqlite:///{tmp_path / 'database.db'}"
+    engine = EngineRegistry.engine_for(db_url)
+    Base.metadata.create_all(engine)
+    with EngineRegistry.session_for(db_url) as session:
+        tree = Tree(path_file="2025_07_08.csv")
+        official_document = OfficialDocument(url="https://example.org", tree=tree)
+        session.add_all([tree, official_document] + [
+            ScrappedDocument(
+                official_document=official_document,
+                url=f"https://example.org/{i}",
+                text=f"Texto {i}",
+                date=datetime.date(2025, 7, 8),
+            )
+            for i in range(DOCUMENTS)
+        ])
+        session.commit()
+    yield db_url
+    engine.dispose()
+
+
+def test_stream_does_not_reload_rows_after_intermediate_commits(db_url):
+    statements = []
+    engine = EngineRegistry.engine_for(db_url)
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "scrapped_documents" in statement:
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        session = PipelineStep._session_on(db_url)
+        tree = session.query(Tree).one()
+        documents = session.query(ScrappedDocument)\
+            .join(OfficialDocument, ScrappedDocument.official_document_id == OfficialDocument.id)\
+            .filter(OfficialDocument.tree_id == tree.id)
+
+        queries_per_page = []
+        # Lotes más chicos que la página: se confirma varias veces en medio de cada una
+        with BatchWriter(session, "test", tree.id, batch_size=3) as writer:
+            for position, document in enumerate(
+                PipelineStep._stream(session, documents, ScrappedDocument.id, page_size=PAGE_SIZE)
+            ):
+                if position % PAGE_SIZE == 0:
+                    queries_per_page.append(len(statements))
+                document.text = document.text.upper()
+                writer.add(document)
+                writer.done(document.id)
+        session.close()
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+
+    # Una sola consulta por página (más la última, vacía): ninguna recarga de filas ya traídas
+    assert queries_per_page == list(range(1, DOCUMENTS // PAGE_SIZE + 1))
+    assert len(statements) == DOCUMENTS // PAGE_SIZE + 1
+
+    with EngineRegistry.session_for(db_url) as session:
+        assert all(text.isupper() for (text,) in session.query(ScrappedDocument.text))
@@ -0,0 +1,79 @@
+import csv
+import pytest
+from chainsaw.db import Base, EngineRegistry
+from chainsaw.enum.field import Field
+from chainsaw.model import Tree
+from chainsaw.model.tree_change import TreeChange
+from chainsaw.tree_diff import TreeDiff
+
+
+ROOT = "Presidencia de la Nación"
+ECONOMY = "Ministerio de Economía"
+
+
+def bime_row(jurisdiction: str, political_unit: str, unit: str, reports_to: str, charge: str) -> list[str]:
+    row = [""] * len(Field)
+    row[Field.jurisdiccion.value] = jurisdiction
+    row[Field.subjurisdiccion.value] = jurisdiction
+    row[Field.unidad_de_nivel_politico.value] = political_unit
+    row[Field.unidad.value] = unit
+    row[Field.reporta_a.value] = reports_to
+    row[Field.tipo_administracion.value] = "Administración Central"
+    row[Field.unidad_clase.value] = "Sustantiva"
+    row[Field.unidad_rango.value] = "Secretaría"
+    row[Field.car_orden.value] = "1"
+    row[Field.cargo.value] = charge
+    return row
+
+
+def write_bime(path, units: list[tuple[str, str]]) -> str:
+    with open(path, "w", encoding="utf-8", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow([field.name for field in Field])
+        writer.writerow(bime_row(ROOT, ROOT, ROOT, "", "Presidente"))
+        writer.writerow(bime_row(ECONOMY, ECONOMY, ECONOMY, ROOT, "Ministro"))
+        for unit, reports_to in units:
+            writer.writerow(bime_row(ECONOMY, unit, unit, reports_to, "Secretario"))
+    return str(path)
+
+
+@pytest.fixture
+def session(tmp_path, monkeypatch):
+    monkeypatch.setattr("chainsaw.model.snapshot.SNAPSHOTS_PATH", str(tmp_path / "snapshots"))
+    db_url = f"sqlite:///{tmp_path / 'database.db'}"
+    engine = EngineRegistry.engine_for(db_url)
+    Base.metadata.create_all(engine)
+    with EngineRegistry.session_for(db_url) as session:
+        yield session
+    engine.dispose()
+
+
+def test_saving_a_diff_keeps_the_rows_of_other_tree_pairs(tmp_path, session):
+    trees = {}
+    for date_string, units in {
+        "2023_12_09": [("Secretaría de Hacienda", ECONOMY), ("Secretaría de Finanzas", ECONOMY)],
+        "2024_06_01": [("Secretaría de Hacienda", ECONOMY), ("Secretaría de Energía", ECONOMY)],
+        "2025_07_08": [("Secretaría de Finanzas", ECONOMY), ("Secretaría de Minería", ECONOMY)],
+    }.items():
+        path_file = write_bime(tmp_path / f"{date_string}.csv", units)
+        trees[date_string] = Tree.load_or_create(path_file, session)
+
+    # Los dos pares comparten el árbol anterior, así que comparten todos los uuid_2023
+    first = TreeDiff(trees["2023_12_09"], trees["2024_06_01"])
+    second = TreeDiff(trees["2023_12_09"], trees["2025_07_08"])
+
+    def rows_of(diff: TreeDiff) -> int:
+        return session.query(TreeChange).filter(
+            TreeChange.tree_id_2023 == diff.old_tree.id,
+            TreeChange.tree_id_2025 == diff.new_tree.id,
+        ).count()
+
+    saved = first.save(session)
+    assert second.save(session) > 0
+    assert rows_of(first) == saved
+
+    # Volver a guardar un par reemplaza sus filas sin duplicarlas ni tocar las del otro
+    assert first.save(session) == saved
+    assert rows_of(first) == saved
+    assert rows_of(second) == len(second.changes())
+    assert session.query(TreeChange).count() == saved + len(second.changes())